@@ -1,4 +1,6 @@
+import json
 from datetime import datetime
+from uuid import uuid4
 import psycopg
 from elastic_transport import ConnectionError as ESConnectionError
 from elasticsearch import Elasticsearch
@@ -12,7 +14,13 @@ from extractors import PostgresExtractor
 from loaders import ESLoader
 from models import transform_model_dict
 from service import NoNewDataError, backoff, es_closing, redis_closing
-from settings import base_es_settings, settings, pg_es_index_name_with_mappings_dict, index_to_tables_dict
+from settings import (
+    ETL_EVENTS_CHANNEL,
+    base_es_settings,
+    index_to_tables_dict,
+    pg_es_index_name_with_mappings_dict,
+    settings,
+)
 from state_rw import RedisStorage, State
 from transformers import PgESTransformer
 
@@ -49,9 +57,10 @@ class ETL:
 
     def action(self, table_name, select_query, transform_model, pg_index_name):
         data = self.extractor.extract(table_name, select_query)
-        transformed_data = self.transformer.transform(table_name, transform_model, data)
+        transformed_data = list(self.transformer.transform(table_name, transform_model, data))
         result = self.loader.load(transformed_data, pg_index_name)
-        return self.get_new_state(pg_index_name, table_name), result
+        ids = [str(row["id"]) for row in transformed_data]
+        return self.get_new_state(pg_index_name, table_name), result, ids
 
 
 @backoff
@@ -108,14 +117,22 @@ def load_from_postgres(
 
     etl = ETL(extractor=pg_extractor, transformer=pg_es_transformer, loader=es_loader, state=state)
 
-    new_state, result = etl.action(table_name, select_query, transform_model, pg_index_name)
+    new_state, result, ids = etl.action(table_name, select_query, transform_model, pg_index_name)
 
     for k, v in new_state.items():
         state.set_state(k, str(v))
 
+    notify_indexed(redis_conn, pg_index_name, ids)
+
     return result
 
 
+def notify_indexed(redis_conn: Redis, pg_index_name: str, ids: list) -> None:
+    """Сообщить API о загруженных документах, чтобы оно обновило справочники и кэш."""
+    event = {"id": uuid4().hex, "index": pg_index_name, "ids": ids}
+    redis_conn.publish(ETL_EVENTS_CHANNEL, json.dumps(event))
+
+
 if __name__ == "__main__":
     while True:
         try:
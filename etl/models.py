@@ -100,12 +100,23 @@ class PersonsTransformModel:
     id: str
     full_name: str
     modified: datetime
+    films: list = field(default_factory=list)
+
+    def __post_init__(self):
+        roles = {}
+        for i in self.films:
+            roles.setdefault(i["film_id"], []).append(i["role"])
+        self.films = [
+            {"id": film_id, "roles": sorted(film_roles)}
+            for film_id, film_roles in roles.items()
+        ]
 
     def as_dict(self) -> dict:
         """Returns ES required properties as dict."""
         rd = {
             "id": self.id,
             "full_name": self.full_name,
+            "films": self.films,
             "modified": self.modified,
         }
 
@@ -103,6 +103,9 @@ def get_connection_params():
 
 settings = Settings()
 
+# Канал Redis для уведомлений API о загруженных документах
+ETL_EVENTS_CHANNEL = "etl:indexed"
+
 
 base_es_settings = {
         'refresh_interval': '1s',
@@ -133,7 +136,10 @@ es_movies_mapping = {
         "title": {
             "type": "text",
             "analyzer": "ru_en",
-            "fields": {"raw": {"type": "keyword"}},
+            "fields": {
+                "raw": {"type": "keyword"},
+                "suggest": {"type": "completion"},
+            },
         },
         "description": {"type": "text", "analyzer": "ru_en"},
         "director": {"type": "text", "analyzer": "ru_en"},
@@ -200,7 +206,18 @@ es_persons_mapping = {
         "full_name": {
             "type": "text",
             "analyzer": "ru_en",
-            "fields": {"raw": {"type": "keyword"}},
+            "fields": {
+                "raw": {"type": "keyword"},
+                "suggest": {"type": "completion"},
+            },
+        },
+        "films": {
+            "type": "nested",
+            "dynamic": "strict",
+            "properties": {
+                "id": {"type": "keyword"},
+                "roles": {"type": "keyword"},
+            },
         },
         "modified": {
             "type": "date"
@@ -260,11 +277,30 @@ index_to_tables_dict = {
         "select_query": """SELECT
                                p.id,
                                p.full_name,
-                               p.modified
+                               GREATEST(p.modified, MAX(pfw.created)) as modified,
+                               COALESCE (
+                                   json_agg(
+                                       DISTINCT jsonb_build_object(
+                                           'film_id', pfw.film_work_id,
+                                           'role', pfw.role
+                                       )
+                                   ) FILTER (WHERE pfw.film_work_id is not null),
+                                   '[]'
+                               ) as films
                            FROM content.person p
-                           WHERE p.modified > %(state)s::timestamp
+                           LEFT JOIN content.person_film_work pfw ON pfw.person_id = p.id
+                           WHERE p.id IN (
+                               SELECT cp.id
+                               FROM content.person cp
+                               WHERE cp.modified > %(state)s::timestamp
+                                   OR EXISTS (
+                                       SELECT 1
+                                       FROM content.person_film_work cpfw
+                                       WHERE cpfw.person_id = cp.id AND cpfw.created > %(state)s::timestamp
+                                   )
+                           )
                            GROUP BY p.id
-                           ORDER BY p.modified DESC;
+                           ORDER BY modified DESC;
                            """,
     },
     "genres": {
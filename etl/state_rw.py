@@ -39,14 +39,23 @@ class JsonFileStorage(BaseStorage):
 
 
 class RedisStorage(BaseStorage):
-    def __init__(self, redis_adapter: Redis):
+    """Хранит состояние в Redis.
+
+    Redis общий с кэшем API, поэтому читаются только ключи состояния ETL:
+    иначе записи кэша перезаписывались бы через MSET без TTL.
+    """
+
+    def __init__(self, redis_adapter: Redis, keys_pattern: str = "*_last_id"):
         self.redis_adapter = redis_adapter
+        self.keys_pattern = keys_pattern
 
     def save_state(self, state: dict):
         self.redis_adapter.mset(state)
 
     def retrieve_state(self):
-        keys = self.redis_adapter.keys("*")
+        keys = self.redis_adapter.keys(self.keys_pattern)
+        if not keys:
+            return {}
         data = self.redis_adapter.mget(keys)
         return {
             key.decode("utf-8"): value.decode("utf-8") for key, value in zip(keys, data)
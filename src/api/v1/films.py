@@ -1,12 +1,21 @@
 from http import HTTPStatus
 
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import UUID4
-
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import UUID4, BaseModel, Field
+
+from src.api.v1.responses import json_response, ndjson_response, page_cache_control
+from src.core.config import (
+    BATCH_MAX_IDS,
+    CACHE_CONTROL_DETAILS,
+    CACHE_CONTROL_LISTS,
+    CACHE_CONTROL_SEARCH,
+)
 from src.models.mixins import UUIDMixin
-from src.services.common import CommonQueryParams
+from src.services.common import FIELDS_DESCRIPTION, CommonQueryParams, ExportQueryParams
 from src.services.film import FilmService, get_film_service
-from src.services.filmdependencies import GenreFilter, MatchQuery, FilmQuery
+from src.services.filmdependencies import FilmFilter, MatchQuery
+from src.services.filmpage import FilmPageService, get_film_page_service
 
 router = APIRouter()
 
@@ -34,40 +43,151 @@ class FilmForList(UUIDMixin):
     imdb_rating: float = 0
 
 
+class GenreFacet(UUIDMixin):
+    name: str
+    count: int
+
+
+class RatingFacet(BaseModel):
+    from_: float = Field(alias="from")
+    count: int
+
+
+class Facets(BaseModel):
+    genre: list[GenreFacet] = []
+    imdb_rating: list[RatingFacet] = []
+
+
+class FilmsWithFacets(BaseModel):
+    items: list[FilmForList]
+    facets: Facets
+
+
+FACETS_DESCRIPTION = "Вернуть вместе со списком фасеты: число фильмов по жанрам и гистограмму рейтинга"
+
+
+class PageGenre(UUIDMixin):
+    name: str
+    description: str | None = None
+
+
+class PagePerson(UUIDMixin):
+    full_name: str
+
+
+class FilmPage(BaseModel):
+    film: Film
+    genres: list[PageGenre] = []
+    persons: list[PagePerson] = []
+
+
+class FilmSuggestion(UUIDMixin):
+    title: str
+
+
+@router.get("/suggest/", response_model=list[FilmSuggestion])
+async def films_suggest(
+    request: Request,
+    prefix: str = Query(..., min_length=1, max_length=100, description="Начало названия фильма"),
+    size: int = Query(10, ge=1, le=20),
+    film_service: FilmService = Depends(get_film_service),
+) -> Response:
+    """Подсказки названий фильмов при наборе."""
+    return json_response(request, await film_service.suggest(prefix, size), CACHE_CONTROL_SEARCH)
+
+
+@router.get("/export/", response_class=StreamingResponse)
+async def films_export(
+    params: ExportQueryParams = Depends(ExportQueryParams),
+    film_service: FilmService = Depends(get_film_service),
+) -> StreamingResponse:
+    """Все фильмы каталога потоком NDJSON, по документу на строку."""
+    return ndjson_response(film_service.export(params), gzip=params.gzip)
+
+
+@router.get("/batch/", response_model=list[Film])
+async def films_batch(
+    request: Request,
+    ids: list[UUID4] = Query(..., min_items=1, max_items=BATCH_MAX_IDS, description="ID фильмов"),
+    fields: str = Query(None, description=FIELDS_DESCRIPTION),
+    film_service: FilmService = Depends(get_film_service),
+) -> Response:
+    """Детальные данные нескольких фильмов за один запрос. Ненайденные фильмы пропускаются."""
+    return json_response(request, await film_service.get_by_ids(ids, fields=fields), CACHE_CONTROL_DETAILS)
+
+
 @router.get("/{film_id}", response_model=Film)
 async def film_details(
-    film_id: UUID4, film_service: FilmService = Depends(get_film_service)
-) -> Film:
-    film = await film_service.get_by_id(film_id)
+    request: Request,
+    film_id: UUID4,
+    fields: str = Query(None, description=FIELDS_DESCRIPTION),
+    film_service: FilmService = Depends(get_film_service),
+) -> Response:
+    film = await film_service.get_by_id(film_id, fields=fields)
     if not film:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="film not found")
 
-    return Film(**film.dict())
+    return json_response(request, film, CACHE_CONTROL_DETAILS)
+
+
+@router.get("/{film_id}/page", response_model=FilmPage)
+async def film_page(
+    request: Request, film_id: UUID4, page_service: FilmPageService = Depends(get_film_page_service)
+) -> Response:
+    """Всё для страницы фильма одним ответом: сам фильм, его жанры и персонажи."""
+    page = await page_service.get_page(film_id)
+    if page is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="film not found")
+
+    return json_response(request, page, CACHE_CONTROL_DETAILS)
+
+
+@router.get("/{film_id}/similar", response_model=list[FilmForList])
+async def films_similar(
+    request: Request, film_id: UUID4, film_service: FilmService = Depends(get_film_service)
+) -> Response:
+    """Фильмы, похожие на данный по жанрам, участникам и описанию."""
+    films = await film_service.get_similar(film_id)
+    if films is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="film not found")
+
+    return json_response(request, films, CACHE_CONTROL_DETAILS)
 
 
-@router.get("/", response_model=list[FilmForList])
+@router.get("/", response_model=list[FilmForList] | FilmsWithFacets)
 async def films_details_cache(
-    filter_: GenreFilter = Depends(GenreFilter),
+    request: Request,
+    filter_: FilmFilter = Depends(FilmFilter),
     commons: CommonQueryParams = Depends(CommonQueryParams),
+    facets: bool = Query(False, description=FACETS_DESCRIPTION),
+    fields: str = Query(None, description=FIELDS_DESCRIPTION),
     film_service: FilmService = Depends(get_film_service),
-) -> list[FilmForList]:
+) -> Response:
 
-    films = await film_service.get_films(commons=commons, filter_=filter_, cache_=True)
+    films = await film_service.get_films(
+        commons=commons, filter_=filter_, cache_=True, facets=facets, fields=fields
+    )
     if not films:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="bad parameters")
 
-    return [FilmForList(**film.dict()) for film in films]
+    return json_response(request, films, page_cache_control(commons, CACHE_CONTROL_LISTS))
 
 
-@router.get("/search/", response_model=list[FilmForList])
-async def films_details_no_cache(
+@router.get("/search/", response_model=list[FilmForList] | FilmsWithFacets)
+async def films_search(
+    request: Request,
     match_query: MatchQuery = Depends(MatchQuery),
+    filter_: FilmFilter = Depends(FilmFilter),
     commons: CommonQueryParams = Depends(CommonQueryParams),
+    facets: bool = Query(False, description=FACETS_DESCRIPTION),
+    fields: str = Query(None, description=FIELDS_DESCRIPTION),
     film_service: FilmService = Depends(get_film_service),
-) -> list[FilmForList]:
+) -> Response:
 
-    films = await film_service.get_films(match_query=match_query, commons=commons, cache_=False)
+    films = await film_service.get_films(
+        match_query=match_query, filter_=filter_, commons=commons, cache_=True, facets=facets, fields=fields
+    )
     if not films:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="mo matches")
 
-    return [FilmForList(**film.dict()) for film in films]
+    return json_response(request, films, page_cache_control(commons, CACHE_CONTROL_SEARCH))
@@ -1,12 +1,15 @@
 from http import HTTPStatus
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
+from src.api.v1.responses import json_response, ndjson_response, page_cache_control
+from src.core.config import CACHE_CONTROL_REFERENCE
 from src.models.mixins import UUIDMixin
 from src.models.genre import GenreIDQueryParams
 from src.services.genre import GenreService, get_genre_service
-from src.services.common import CommonQueryParamsMixin
+from src.services.common import FIELDS_DESCRIPTION, CommonQueryParamsMixin, ExportQueryParams
 
 router = APIRouter()
 
@@ -21,20 +24,31 @@ class GenreDetails(UUIDMixin):
 
 
 @router.get("/", response_model=List[GenresList])
-async def genre_list(common: CommonQueryParamsMixin = Depends(),
-                     genre_service: GenreService = Depends(get_genre_service)) -> List[GenresList]:
-    genres = await genre_service.get_genres(common)
+async def genre_list(request: Request,
+                     common: CommonQueryParamsMixin = Depends(),
+                     fields: str = Query(None, description=FIELDS_DESCRIPTION),
+                     genre_service: GenreService = Depends(get_genre_service)) -> Response:
+    genres = await genre_service.get_genres(common, fields)
     if not genres:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Genres not found")
 
-    return [GenresList(**genre.dict()) for genre in genres]
+    return json_response(request, genres, page_cache_control(common, CACHE_CONTROL_REFERENCE))
+
+
+@router.get("/export/", response_class=StreamingResponse)
+async def genres_export(params: ExportQueryParams = Depends(ExportQueryParams),
+                        genre_service: GenreService = Depends(get_genre_service)) -> StreamingResponse:
+    """Все жанры потоком NDJSON, по документу на строку."""
+    return ndjson_response(genre_service.export(params), gzip=params.gzip)
 
 
 @router.get("/{genre_id}", response_model=GenreDetails)
-async def genre_details(common: GenreIDQueryParams = Depends(GenreIDQueryParams),
-                        genre_service: GenreService = Depends(get_genre_service)) -> GenreDetails:
-    genre = await genre_service.get_genre_by_id(common.id)
+async def genre_details(request: Request,
+                        common: GenreIDQueryParams = Depends(GenreIDQueryParams),
+                        fields: str = Query(None, description=FIELDS_DESCRIPTION),
+                        genre_service: GenreService = Depends(get_genre_service)) -> Response:
+    genre = await genre_service.get_genre_by_id(common.id, fields)
     if not genre:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Genre not found")
 
-    return GenreDetails(**genre.dict())
+    return json_response(request, genre, CACHE_CONTROL_REFERENCE)
@@ -1,12 +1,16 @@
 from http import HTTPStatus
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import UUID4
 
+from src.api.v1.responses import json_response, ndjson_response, page_cache_control
+from src.core.config import BATCH_MAX_IDS, CACHE_CONTROL_DETAILS, CACHE_CONTROL_LISTS, CACHE_CONTROL_SEARCH
 from src.models.mixins import UUIDMixin
 from src.models.person import PersonIDQueryParams
 from src.services.person import PersonService, get_person_service
-from src.services.common import CommonQueryParamsMixin
+from src.services.common import FIELDS_DESCRIPTION, CommonQueryParamsMixin, ExportQueryParams
 
 router = APIRouter()
 
@@ -15,21 +19,69 @@ class Person(UUIDMixin):
     full_name: str
 
 
+class PersonFilm(UUIDMixin):
+    title: str
+    imdb_rating: float = 0
+    roles: List[str] = []
+
+
 @router.get("/", response_model=List[Person])
-async def person_list(commons: CommonQueryParamsMixin = Depends(CommonQueryParamsMixin),
-                      person_service: PersonService = Depends(get_person_service)) -> List[Person]:
-    persons = await person_service.get_persons(commons)
+async def person_list(request: Request,
+                      commons: CommonQueryParamsMixin = Depends(CommonQueryParamsMixin),
+                      fields: str = Query(None, description=FIELDS_DESCRIPTION),
+                      person_service: PersonService = Depends(get_person_service)) -> Response:
+    persons = await person_service.get_persons(commons, fields)
     if not persons:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Persons not found")
 
-    return [Person(**person.dict()) for person in persons]
+    return json_response(request, persons, page_cache_control(commons, CACHE_CONTROL_LISTS))
+
+
+@router.get("/suggest/", response_model=List[Person])
+async def persons_suggest(request: Request,
+                          prefix: str = Query(..., min_length=1, max_length=100, description="Начало имени"),
+                          size: int = Query(10, ge=1, le=20),
+                          person_service: PersonService = Depends(get_person_service)) -> Response:
+    """Подсказки имён персонажей при наборе."""
+    return json_response(request, await person_service.suggest(prefix, size), CACHE_CONTROL_SEARCH)
+
+
+@router.get("/export/", response_class=StreamingResponse)
+async def persons_export(params: ExportQueryParams = Depends(ExportQueryParams),
+                         person_service: PersonService = Depends(get_person_service)) -> StreamingResponse:
+    """Все персонажи потоком NDJSON, по документу на строку."""
+    return ndjson_response(person_service.export(params), gzip=params.gzip)
+
+
+@router.get("/batch/", response_model=List[Person])
+async def persons_batch(request: Request,
+                        ids: List[UUID4] = Query(..., min_items=1, max_items=BATCH_MAX_IDS, description="ID персонажей"),
+                        fields: str = Query(None, description=FIELDS_DESCRIPTION),
+                        person_service: PersonService = Depends(get_person_service)) -> Response:
+    """Данные нескольких персонажей за один запрос. Ненайденные персонажи пропускаются."""
+    body = await person_service.get_by_ids([str(person_id) for person_id in ids], fields)
+    return json_response(request, body, CACHE_CONTROL_DETAILS)
 
 
 @router.get("/{person_id}", response_model=Person)
-async def person_details(commons: PersonIDQueryParams = Depends(PersonIDQueryParams),
-                         person_service: PersonService = Depends(get_person_service)) -> Person:
-    person = await person_service.get_person_by_id(commons.id)
+async def person_details(request: Request,
+                         commons: PersonIDQueryParams = Depends(PersonIDQueryParams),
+                         fields: str = Query(None, description=FIELDS_DESCRIPTION),
+                         person_service: PersonService = Depends(get_person_service)) -> Response:
+    person = await person_service.get_person_by_id(commons.id, fields)
     if not person:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Person not found")
 
-    return Person(**person.dict())
+    return json_response(request, person, CACHE_CONTROL_DETAILS)
+
+
+@router.get("/{person_id}/films", response_model=List[PersonFilm])
+async def person_films(request: Request,
+                       commons: PersonIDQueryParams = Depends(PersonIDQueryParams),
+                       person_service: PersonService = Depends(get_person_service)) -> Response:
+    """Фильмография персонажа с его ролями в каждом фильме."""
+    films = await person_service.get_filmography(commons.id)
+    if not films:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Person not found")
+
+    return json_response(request, films, CACHE_CONTROL_DETAILS)
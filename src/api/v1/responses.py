@@ -0,0 +1,52 @@
+from typing import AsyncIterator
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+from src.core.config import CACHE_CONTROL_NO_STORE
+from src.services import compression
+from src.services.cache import ResponseBody
+from src.services.common import CursorParamsMixin
+from src.services.export import NDJSON_MEDIA_TYPE
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def page_cache_control(commons: CursorParamsMixin, cache_control: str) -> str:
+    """Страницы внутри point-in-time принадлежат одному клиенту — их не кэширует никто."""
+    return cache_control if commons.cacheable else CACHE_CONTROL_NO_STORE
+
+
+def json_response(request: Request, body: ResponseBody, cache_control: str) -> Response:
+    """Отдаёт готовое тело из сервиса без повторной валидации по response_model.
+
+    Тело сжимается лучшей из поддерживаемых клиентом кодировок, если оно не меньше
+    `COMPRESSION_MIN_SIZE`; у сжатого варианта свой ETag. Если у клиента уже есть
+    эта версия ответа (совпал If-None-Match), отвечает 304 без тела.
+    """
+    headers = {**body.headers, "Cache-Control": cache_control}
+    encoding = None
+    if body.compressible:
+        headers["Vary"] = "Accept-Encoding"
+        encoding = compression.negotiate(request.headers.get("accept-encoding"))
+    if encoding:
+        headers["ETag"] = f'{body.etag[:-1]}-{encoding}"'
+        headers["Content-Encoding"] = encoding
+
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    content = body.encode(encoding) if encoding else body.content
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def ndjson_response(stream: AsyncIterator[bytes], gzip: bool = False) -> StreamingResponse:
+    """Потоковый ответ NDJSON; куски отправляются по мере чтения из ES."""
+    headers = {"Content-Encoding": "gzip"} if gzip else None
+    return StreamingResponse(stream, media_type=NDJSON_MEDIA_TYPE, headers=headers)
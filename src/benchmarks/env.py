@@ -0,0 +1,14 @@
+import os
+
+# Настройки подключений нужны только для импорта src.core.config; в бенчмарках клиенты подменяются.
+DEFAULT_ENV = {
+    "redis_host": "localhost",
+    "redis_port": "6379",
+    "es_host": "http://localhost",
+    "es_port": "9200",
+}
+
+
+def setup_env() -> None:
+    for name, value in DEFAULT_ENV.items():
+        os.environ.setdefault(name, value)
@@ -0,0 +1,324 @@
+"""Подменные ES и Redis в памяти процесса для нагрузочных тестов.
+
+Отдают заранее сгенерированные данные и добавляют к каждому вызову
+настраиваемую задержку, имитируя сеть. Поддерживают ровно те вызовы,
+которые делают сервисы API.
+"""
+import asyncio
+import random
+import time
+import uuid
+from typing import Optional
+
+from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig
+from elasticsearch import NotFoundError
+
+GENRE_NAMES = ["Action", "Adventure", "Comedy", "Drama", "Fantasy", "Horror", "Sci-Fi", "Thriller"]
+
+
+def make_catalog(films: int = 1000, persons: int = 500, seed: int = 0) -> dict[str, list[dict]]:
+    """Детерминированные документы индексов `movies`, `genres` и `persons` в формате ETL."""
+    rnd = random.Random(seed)
+
+    def new_id() -> str:
+        return str(uuid.UUID(int=rnd.getrandbits(128), version=4))
+
+    genres = [{"id": new_id(), "genre_name": name, "description": f"{name} films"} for name in GENRE_NAMES]
+    people = [{"id": new_id(), "full_name": f"Person {i}", "films": []} for i in range(persons)]
+    movies = []
+    for i in range(films):
+        cast = rnd.sample(people, 12)
+        film = {
+            "id": new_id(),
+            "title": f"Film {i}",
+            "imdb_rating": round(rnd.uniform(1, 10), 1),
+            "description": "Description " * 30,
+            "genre": [{"id": g["id"], "name": g["genre_name"]} for g in rnd.sample(genres, 2)],
+            "actors": [{"id": p["id"], "name": p["full_name"]} for p in cast[:8]],
+            "writers": [{"id": p["id"], "name": p["full_name"]} for p in cast[8:10]],
+            "directors": [{"id": p["id"], "name": p["full_name"]} for p in cast[10:]],
+        }
+        for person, role in zip(cast, ["actor"] * 8 + ["writer"] * 2 + ["director"] * 2):
+            person["films"].append({"id": film["id"], "roles": [role]})
+        movies.append(film)
+    return {"movies": movies, "genres": genres, "persons": people}
+
+
+def project(source: dict, includes: Optional[list[str]]) -> dict:
+    if not includes:
+        return source
+    projected = {}
+    for field in includes:
+        name, _, subfield = field.partition(".")
+        if name not in source:
+            continue
+        value = source[name]
+        if subfield and isinstance(value, list):
+            value = [{subfield: item[subfield]} for item in value if subfield in item]
+        projected[name] = value
+    return projected
+
+
+class Latency:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    async def wait(self) -> None:
+        if self.seconds:
+            await asyncio.sleep(self.seconds)
+
+
+class FakeElasticsearch:
+    """Отвечает документами из `make_catalog`; запросы и сортировки не вычисляются, важны только объём и форма ответа."""
+
+    def __init__(self, catalog: dict[str, list[dict]], latency: float = 0.0):
+        self.indices = catalog
+        self.by_id = {index: {doc["id"]: doc for doc in docs} for index, docs in catalog.items()}
+        self.latency = Latency(latency)
+        self.pits: dict[str, str] = {}
+
+    async def ping(self, **kwargs) -> bool:
+        await self.latency.wait()
+        return True
+
+    async def get(self, *, index: str, id: str, source_includes: Optional[list[str]] = None, **kwargs):
+        await self.latency.wait()
+        doc = self.by_id[index].get(str(id))
+        if doc is None:
+            meta = ApiResponseMeta(
+                status=404, http_version="1.1", headers=HttpHeaders(), duration=0.0,
+                node=NodeConfig("http", "localhost", 9200),
+            )
+            raise NotFoundError("not_found", meta, {"found": False})
+        return {"_id": doc["id"], "found": True, "_source": project(doc, source_includes)}
+
+    async def mget(self, *, index: str, ids: list[str], source_includes: Optional[list[str]] = None, **kwargs):
+        await self.latency.wait()
+        docs = []
+        for id_ in ids:
+            doc = self.by_id[index].get(str(id_))
+            if doc is None:
+                docs.append({"_id": id_, "found": False})
+            else:
+                docs.append({"_id": id_, "found": True, "_source": project(doc, source_includes)})
+        return {"docs": docs}
+
+    async def open_point_in_time(self, *, index: str, **kwargs):
+        await self.latency.wait()
+        pit_id = uuid.uuid4().hex
+        self.pits[pit_id] = index
+        return {"id": pit_id}
+
+    async def close_point_in_time(self, *, id: str, **kwargs):
+        await self.latency.wait()
+        self.pits.pop(id, None)
+        return {"succeeded": True}
+
+    async def search(
+        self,
+        *,
+        index: Optional[str] = None,
+        pit: Optional[dict] = None,
+        size: int = 10,
+        from_: int = 0,
+        search_after: Optional[list] = None,
+        source_includes: Optional[list[str]] = None,
+        suggest: Optional[dict] = None,
+        aggs: Optional[dict] = None,
+        **kwargs,
+    ):
+        await self.latency.wait()
+        index = self.pits[pit["id"]] if pit else index
+        docs = self.indices[index]
+        response = {}
+        if pit:
+            response["pit_id"] = pit["id"]
+        if suggest:
+            name, body = next(iter(suggest.items()))
+            options = [{"_source": project(doc, source_includes)} for doc in docs[: body["completion"]["size"]]]
+            response["suggest"] = {name: [{"options": options}]}
+            return response
+        if aggs:
+            response["aggregations"] = self._aggregations(index)
+        start = search_after[0] + 1 if search_after else from_
+        response["hits"] = {
+            "hits": [
+                {"_id": doc["id"], "_source": project(doc, source_includes), "sort": [position]}
+                for position, doc in enumerate(docs[start:start + size], start)
+            ]
+        }
+        return response
+
+    def _aggregations(self, index: str) -> dict:
+        genres = self.indices["genres"]
+        return {
+            "genre": {
+                "ids": {
+                    "buckets": [
+                        {
+                            "key": genre["id"],
+                            "doc_count": 100,
+                            "name": {"hits": {"hits": [{"_source": {"id": genre["id"], "name": genre["genre_name"]}}]}},
+                        }
+                        for genre in genres
+                    ]
+                }
+            },
+            "imdb_rating": {"buckets": [{"key": float(i), "doc_count": 100} for i in range(11)]},
+        }
+
+    async def close(self) -> None:
+        pass
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> list:
+        await self.redis.latency.wait()
+        results = [getattr(self.redis, f"_{name}")(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+
+class FakePubSub:
+    """Подписка, в которую никто не публикует."""
+
+    async def subscribe(self, *channels):
+        pass
+
+    async def listen(self):
+        await asyncio.Event().wait()
+        yield
+
+    async def reset(self):
+        pass
+
+
+class FakeScript:
+    """Скрипт Lua не выполняется: лимитер всегда получает токен."""
+
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+
+    async def __call__(self, keys=None, args=None):
+        await self.redis.latency.wait()
+        return [1, b"0"]
+
+
+class FakeRedis:
+    """Словарь с TTL, хеши — вложенные словари; каждая команда или конвейер стоят одну задержку сети."""
+
+    def __init__(self, latency: float = 0.0):
+        self.data: dict[str, tuple[bytes | dict[str, bytes], Optional[float]]] = {}
+        self.latency = Latency(latency)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at < time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def _set(self, key: str, value, ex: Optional[int] = None, nx: bool = False, **kwargs) -> Optional[bool]:
+        if nx and self._get(key) is not None:
+            return None
+        if isinstance(value, str):
+            value = value.encode()
+        self.data[key] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    def _hget(self, key: str, field: str) -> Optional[bytes]:
+        return (self._get(key) or {}).get(field)
+
+    def _hset(self, key: str, field: str, value) -> int:
+        if isinstance(value, str):
+            value = value.encode()
+        fields = self._get(key)
+        if fields is None:
+            fields = {}
+            self.data[key] = (fields, None)
+        added = field not in fields
+        fields[field] = value
+        return int(added)
+
+    def _incr(self, key: str) -> int:
+        value = int(self._get(key) or 0) + 1
+        expires_at = self.data[key][1] if key in self.data else None
+        self.data[key] = (str(value).encode(), expires_at)
+        return value
+
+    def _delete(self, *keys: str) -> int:
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def _expire(self, key: str, seconds: int, nx: bool = False) -> bool:
+        if self._get(key) is None or nx and self.data[key][1] is not None:
+            return False
+        self.data[key] = (self.data[key][0], time.monotonic() + seconds)
+        return True
+
+    async def get(self, key: str):
+        await self.latency.wait()
+        return self._get(key)
+
+    async def set(self, key: str, value, ex: Optional[int] = None, nx: bool = False, **kwargs):
+        await self.latency.wait()
+        return self._set(key, value, ex, nx)
+
+    async def hget(self, key: str, field: str):
+        await self.latency.wait()
+        return self._hget(key, field)
+
+    async def hset(self, key: str, field: str, value):
+        await self.latency.wait()
+        return self._hset(key, field, value)
+
+    async def mget(self, keys: list[str]):
+        await self.latency.wait()
+        return [self._get(key) for key in keys]
+
+    async def ping(self) -> bool:
+        await self.latency.wait()
+        return True
+
+    async def delete(self, *keys: str):
+        await self.latency.wait()
+        return self._delete(*keys)
+
+    async def incr(self, key: str):
+        await self.latency.wait()
+        return self._incr(key)
+
+    async def expire(self, key: str, seconds: int, nx: bool = False):
+        await self.latency.wait()
+        return self._expire(key, seconds, nx)
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    def register_script(self, script: str) -> FakeScript:
+        return FakeScript(self)
+
+    def pubsub(self, **kwargs) -> FakePubSub:
+        return FakePubSub()
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,130 @@
+"""Замер CPU на запрос для `/api/v1/films/{film_id}`: прежний путь через модели против готовых байтов.
+
+Оба пути выполняются одинаково: корутина на запрос через `run_until_complete`,
+кэш и ES — подменные из `fakes` без задержки, так что в замер входит работа
+процесса, а не сети. Прежний путь читает из кэша сырой `_source` и собирает
+модели; текущий — вызов `FilmService.get_by_id` и `json_response`, как в ручке.
+Клиент без Accept-Encoding: прежнее приложение само ответы не сжимало.
+
+Запуск из корня репозитория:
+    python -m src.benchmarks.film_details
+"""
+import asyncio
+import timeit
+import uuid
+
+import orjson
+
+from src.benchmarks.env import setup_env
+
+setup_env()
+
+from fastapi.responses import ORJSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+from src.api.v1.films import Film as FilmResponse  # noqa: E402
+from src.api.v1.responses import json_response  # noqa: E402
+from src.benchmarks.fakes import FakeElasticsearch, FakeRedis  # noqa: E402
+from src.core.config import CACHE_CONTROL_DETAILS, FILM_CACHE_EXPIRE_IN_SECONDS  # noqa: E402
+from src.models.film import Film, Genre, Person  # noqa: E402
+from src.services.film import FilmService  # noqa: E402
+
+NUMBER = 2000
+
+
+def make_source(persons: int = 15) -> dict:
+    def people(n):
+        return [{"id": str(uuid.uuid4()), "name": f"Person {i}"} for i in range(n)]
+
+    return {
+        "id": str(uuid.uuid4()),
+        "title": "Star Wars: Episode IV - A New Hope",
+        "imdb_rating": 8.6,
+        "description": "The Imperial Forces hold Princess Leia hostage. " * 10,
+        "genre": [{"id": str(uuid.uuid4()), "name": name} for name in ("Action", "Adventure", "Fantasy")],
+        "actors": people(persons),
+        "writers": people(persons // 3),
+        "directors": people(2),
+        "actors_names": [],
+        "writers_names": [],
+        "director": [],
+        "modified": "2023-03-01T00:00:00+00:00",
+    }
+
+
+def json_to_film(films_json: dict) -> Film:
+    """Сборка моделей в том виде, в каком она была в FilmService._json_to_film."""
+    return Film(
+        id=films_json["id"],
+        imdb_rating=films_json["imdb_rating"],
+        description=films_json["description"],
+        title=films_json["title"],
+        actors=[Person(**f) for f in films_json["actors"]],
+        directors=[Person(**f) for f in films_json["directors"]],
+        writers=[Person(**f) for f in films_json["writers"]],
+        genre=[Genre(**f) for f in films_json["genre"]],
+    )
+
+
+async def models_path(redis: FakeRedis, elastic: FakeElasticsearch, film_id: str, field) -> bytes:
+    """Сырой `_source` из кэша (при промахе — из ES с записью в кэш) -> Film -> Film API
+    -> валидация response_model -> ORJSONResponse."""
+    key = f"film:{film_id}"
+    cached = await redis.get(key)
+    if cached is None:
+        doc = await elastic.get(index="movies", id=film_id)
+        cached = orjson.dumps(doc["_source"])
+        await redis.set(key, cached, ex=FILM_CACHE_EXPIRE_IN_SECONDS)
+    film = json_to_film(orjson.loads(cached))
+    content = await serialize_response(field=field, response_content=FilmResponse(**film.dict()))
+    return ORJSONResponse(content).body
+
+
+async def bytes_path(service: FilmService, request: Request, film_id: uuid.UUID) -> bytes:
+    """Тело из `ResponseCache` (при промахе — из ES с записью в кэш) -> `json_response` с ETag и заголовками."""
+    body = await service.get_by_id(film_id)
+    return json_response(request, body, CACHE_CONTROL_DETAILS).body
+
+
+def run():
+    source = make_source()
+    film_id = source["id"]
+    redis = FakeRedis()
+    elastic = FakeElasticsearch({"movies": [source]})
+    service = FilmService(redis, elastic)
+    request = Request({"type": "http", "method": "GET", "path": f"/api/v1/films/{film_id}", "headers": []})
+    field = create_response_field(name="Response_film_details", type_=FilmResponse)
+    loop = asyncio.new_event_loop()
+
+    def models(miss: bool) -> bytes:
+        if miss:
+            redis.data.clear()
+        return loop.run_until_complete(models_path(redis, elastic, film_id, field))
+
+    def bytes_(miss: bool) -> bytes:
+        if miss:
+            redis.data.clear()
+        return loop.run_until_complete(bytes_path(service, request, uuid.UUID(film_id)))
+
+    cases = {
+        "hit, models": lambda: models(miss=False),
+        "hit, bytes": lambda: bytes_(miss=False),
+        "miss, models": lambda: models(miss=True),
+        "miss, bytes": lambda: bytes_(miss=True),
+    }
+    assert orjson.loads(cases["hit, models"]()) == orjson.loads(cases["hit, bytes"]())
+
+    results = {}
+    for name, case in cases.items():
+        results[name] = min(timeit.repeat(case, number=NUMBER, repeat=5)) / NUMBER * 1e6
+        print(f"{name:<14} {results[name]:9.1f} us/request")
+    for kind in ("hit", "miss"):
+        saved = results[f"{kind}, models"] - results[f"{kind}, bytes"]
+        print(f"{kind}: saved {saved:.1f} us/request ({results[f'{kind}, models'] / results[f'{kind}, bytes']:.1f}x)")
+    loop.close()
+
+
+if __name__ == "__main__":
+    run()
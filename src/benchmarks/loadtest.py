@@ -0,0 +1,206 @@
+"""Нагрузочный тест API на подменных ES и Redis с контролем регрессий задержки.
+
+Приложение из `src.main` запускается в процессе через ASGI-транспорт httpx,
+клиенты ES и Redis подменяются на `fakes` с заданной задержкой. Сценарии
+для роутеров films, genres и persons выполняются с постоянной
+конкурентностью. Тест печатает пропускную способность и p50/p95/p99 и
+сравнивает их с эталонной ревизией, замеренной тут же на той же машине
+(см. `reference`), либо с сохранённым отчётом.
+
+Запуск из корня репозитория:
+    python -m src.benchmarks.loadtest                           # сравнить с HEAD
+    python -m src.benchmarks.loadtest --reference origin/main   # сравнить с другой ревизией
+    python -m src.benchmarks.loadtest --save-baseline --baseline report.json
+    python -m src.benchmarks.loadtest --baseline report.json    # сравнить с отчётом с этой же машины
+"""
+import argparse
+import asyncio
+import logging
+import math
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable
+
+import orjson
+
+from src.benchmarks.env import setup_env
+
+setup_env()
+
+import httpx  # noqa: E402
+
+from src.benchmarks.fakes import FakeElasticsearch, FakeRedis, make_catalog  # noqa: E402
+from src.benchmarks.reference import compare_with_reference  # noqa: E402
+from src.db import elastic, redis  # noqa: E402
+from src.main import app  # noqa: E402
+from src.services.genre import catalog as genre_catalog  # noqa: E402
+
+# Лог каждого запроса httpx сам по себе заметно влияет на замер
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+PERCENTILES = (50, 95, 99)
+# Метрики, по которым ищется регрессия: рост задержки или падение пропускной способности.
+# p99 за несколько секунд замера — единицы запросов на сценарий, его разброс между
+# одинаковыми прогонами больше допуска, поэтому он печатается, но не проверяется.
+CHECKED_PERCENTILES = ("p50", "p95")
+
+Scenario = Callable[[random.Random], str]
+
+
+def make_scenarios(catalog: dict[str, list[dict]]) -> dict[str, Scenario]:
+    films = [film["id"] for film in catalog["movies"]]
+    genres = [genre["id"] for genre in catalog["genres"]]
+    persons = [person["id"] for person in catalog["persons"]]
+    queries = [f"film {i}" for i in range(20)]
+    return {
+        "film_details": lambda rnd: f"/api/v1/films/{rnd.choice(films)}",
+        "film_page": lambda rnd: f"/api/v1/films/{rnd.choice(films)}/page",
+        "film_similar": lambda rnd: f"/api/v1/films/{rnd.choice(films)}/similar",
+        "films_list": lambda rnd: f"/api/v1/films/?sort=-imdb_rating&page={rnd.randint(1, 5)}",
+        "films_search": lambda rnd: f"/api/v1/films/search/?query={rnd.choice(queries)}",
+        "genres_list": lambda rnd: "/api/v1/genres/?sort=name:asc",
+        "genre_details": lambda rnd: f"/api/v1/genres/{rnd.choice(genres)}",
+        "persons_list": lambda rnd: f"/api/v1/persons/?page={rnd.randint(1, 5)}",
+        "person_details": lambda rnd: f"/api/v1/persons/{rnd.choice(persons)}",
+    }
+
+
+def percentile(values: list[float], p: int) -> float:
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+async def run(args) -> dict:
+    catalog = make_catalog(seed=args.seed)
+    elastic.es = FakeElasticsearch(catalog, latency=args.es_latency_ms / 1000)
+    redis.redis = FakeRedis(latency=args.redis_latency_ms / 1000)
+    await genre_catalog.load(elastic.es)
+    scenarios = list(make_scenarios(catalog).items())
+
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+
+    async def worker(client: httpx.AsyncClient, rnd: random.Random, until: float, record: bool) -> None:
+        while time.perf_counter() < until:
+            name, scenario = rnd.choice(scenarios)
+            start = time.perf_counter()
+            response = await client.get(scenario(rnd))
+            elapsed = time.perf_counter() - start
+            if not record:
+                continue
+            if response.status_code >= 500:
+                errors[name] += 1
+            latencies[name].append(elapsed)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        for duration, record in ((args.warmup, False), (args.duration, True)):
+            until = time.perf_counter() + duration
+            await asyncio.gather(
+                *(worker(client, random.Random(args.seed + i), until, record) for i in range(args.concurrency))
+            )
+
+    total = sum(len(values) for values in latencies.values())
+    report = {"throughput": total / args.duration, "scenarios": {}}
+    for name, values in sorted(latencies.items()):
+        values.sort()
+        report["scenarios"][name] = {
+            "requests": len(values),
+            "errors": errors[name],
+            **{f"p{p}": percentile(values, p) * 1000 for p in PERCENTILES},
+        }
+    return report
+
+
+def print_report(report: dict) -> None:
+    print(f"{'scenario':<16}{'requests':>10}{'errors':>8}" + "".join(f"{'p' + str(p) + ' ms':>10}" for p in PERCENTILES))
+    for name, stats in report["scenarios"].items():
+        print(
+            f"{name:<16}{stats['requests']:>10}{stats['errors']:>8}"
+            + "".join(f"{stats[f'p{p}']:>10.2f}" for p in PERCENTILES)
+        )
+    print(f"throughput: {report['throughput']:.0f} req/s")
+
+
+def best_report(reports: list[dict]) -> dict:
+    """Лучший результат каждой метрики по раундам: максимум пропускной способности и минимумы процентилей."""
+    best = {"throughput": max(report["throughput"] for report in reports), "scenarios": {}}
+    for name in sorted({name for report in reports for name in report["scenarios"]}):
+        runs = [report["scenarios"][name] for report in reports if name in report["scenarios"]]
+        best["scenarios"][name] = {
+            "requests": sum(stats["requests"] for stats in runs),
+            "errors": sum(stats["errors"] for stats in runs),
+            **{f"p{p}": min(stats[f"p{p}"] for stats in runs) for p in PERCENTILES},
+        }
+    return best
+
+
+def find_regressions(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    if report["throughput"] < baseline["throughput"] * (1 - tolerance):
+        regressions.append(f"throughput {report['throughput']:.0f} < baseline {baseline['throughput']:.0f} req/s")
+    for name, expected in baseline["scenarios"].items():
+        actual = report["scenarios"].get(name)
+        if actual is None:
+            regressions.append(f"{name}: scenario is missing")
+            continue
+        if actual["errors"]:
+            regressions.append(f"{name}: {actual['errors']} server errors")
+        for key in CHECKED_PERCENTILES:
+            if actual[key] > expected[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {actual[key]:.2f} ms > baseline {expected[key]:.2f} ms")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=4, help="секунд замера")
+    parser.add_argument("--warmup", type=float, default=1, help="секунд прогрева, не входящих в замер")
+    parser.add_argument("--es-latency-ms", type=float, default=2)
+    parser.add_argument("--redis-latency-ms", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение относительно эталона")
+    parser.add_argument("--reference", default="HEAD", help="ревизия git, с которой сравнивается текущее дерево")
+    parser.add_argument("--rounds", type=int, default=8, help="чередующихся раундов эталона и текущего дерева")
+    parser.add_argument("--baseline", type=Path, help="сравнить с сохранённым отчётом вместо эталонной ревизии")
+    parser.add_argument("--save-baseline", action="store_true", help="сохранить отчёт в --baseline")
+    args = parser.parse_args()
+    if args.save_baseline and args.baseline is None:
+        parser.error("--save-baseline requires --baseline")
+
+    if args.baseline is None:
+        options = [
+            "--concurrency", str(args.concurrency), "--duration", str(args.duration), "--warmup", str(args.warmup),
+            "--es-latency-ms", str(args.es_latency_ms), "--redis-latency-ms", str(args.redis_latency_ms),
+            "--seed", str(args.seed),
+        ]
+        report, baseline = compare_with_reference(
+            "src.benchmarks.loadtest", args.reference, options, args.rounds, best_report
+        )
+        print(f"reference {args.reference}:")
+        print_report(baseline)
+        print("current tree:")
+        print_report(report)
+    else:
+        report = asyncio.run(run(args))
+        print_report(report)
+        if args.save_baseline:
+            args.baseline.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+            print(f"baseline saved to {args.baseline}")
+            return 0
+        if not args.baseline.exists():
+            print(f"no baseline at {args.baseline}, run with --save-baseline to record one")
+            return 1
+        baseline = orjson.loads(args.baseline.read_bytes())
+
+    regressions = find_regressions(report, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
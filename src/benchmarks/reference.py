@@ -0,0 +1,59 @@
+"""Сравнение бенчмарка с эталонной ревизией на той же машине.
+
+Абсолютные задержки зависят от машины и её загрузки: базовая линия, записанная
+на одной машине, на другой даёт ложные регрессии. Поэтому эталонная ревизия
+(по умолчанию HEAD) выгружается во временный `git worktree` и замеряется тут же,
+раунды эталона и текущего дерева чередуются, а из раундов каждой стороны берётся
+лучший — так фоновый шум машины одинаково достаётся обеим сторонам.
+"""
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator
+
+import orjson
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+@contextmanager
+def worktree(ref: str) -> Iterator[Path]:
+    """Временная выгрузка ревизии `ref` рядом с репозиторием."""
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as tmp:
+        path = Path(tmp) / "reference"
+        subprocess.run(["git", "worktree", "add", "--quiet", "--detach", str(path), ref], cwd=ROOT, check=True)
+        try:
+            yield path
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", str(path)], cwd=ROOT, check=True)
+
+
+def measure(root: Path, module: str, options: list[str]) -> dict:
+    """Один прогон бенчмарка из дерева `root` отдельным процессом; отчёт забирается из файла базовой линии."""
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as tmp:
+        report_path = Path(tmp) / "report.json"
+        result = subprocess.run(
+            [sys.executable, "-m", module, *options, "--save-baseline", "--baseline", str(report_path)],
+            cwd=root,
+            capture_output=True,
+        )
+        if result.returncode:
+            sys.stderr.write(result.stderr.decode())
+            raise RuntimeError(f"{module} failed in {root} with exit code {result.returncode}")
+        return orjson.loads(report_path.read_bytes())
+
+
+def compare_with_reference(
+    module: str, ref: str, options: list[str], rounds: int, best: Callable[[list[dict]], dict]
+) -> tuple[dict, dict]:
+    """Лучшие отчёты текущего дерева и ревизии `ref` по `rounds` раундам; в каждом раунде стороны
+    меняются местами, чтобы ни одна не шла всё время второй."""
+    reports: dict[Path, list[dict]] = {ROOT: []}
+    with worktree(ref) as reference_root:
+        reports[reference_root] = []
+        for round_ in range(rounds):
+            for root in (reference_root, ROOT) if round_ % 2 == 0 else (ROOT, reference_root):
+                reports[root].append(measure(root, module, options))
+        return best(reports[ROOT]), best(reports[reference_root])
@@ -0,0 +1,135 @@
+"""Замер холодного старта: время импорта приложения и время `startup()` до готовности.
+
+Каждый прогон — отдельный процесс, чтобы импорт шёл с нуля. `startup()`
+выполняется на подменных ES и Redis из `fakes` с заданной задержкой, так что
+замер показывает стоимость кода старта без сети. Медианы сравниваются с эталонной
+ревизией, замеренной тут же на той же машине, либо с сохранённым отчётом, как в `loadtest`.
+
+Запуск из корня репозитория:
+    python -m src.benchmarks.startup                          # сравнить с HEAD
+    python -m src.benchmarks.startup --reference origin/main  # сравнить с другой ревизией
+    python -m src.benchmarks.startup --save-baseline --baseline startup.json
+    python -m src.benchmarks.startup --baseline startup.json  # сравнить с отчётом с этой же машины
+"""
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import orjson
+
+from src.benchmarks.reference import ROOT, compare_with_reference
+
+METRICS = ("import", "startup")
+
+
+def measure_once(es_latency: float, redis_latency: float) -> dict:
+    """Выполняется в дочернем процессе: импорт приложения и его старт."""
+    from src.benchmarks.env import setup_env
+
+    setup_env()
+    start = time.perf_counter()
+    from src import main
+    import_seconds = time.perf_counter() - start
+
+    from src.benchmarks.fakes import FakeElasticsearch, FakeRedis, make_catalog
+    from src.db import elastic, redis
+    from src.services.readiness import readiness
+
+    catalog = make_catalog()
+    redis.create_client = lambda settings: FakeRedis(latency=redis_latency)
+    redis.create_subscriber = lambda settings: FakeRedis(latency=redis_latency)
+    elastic.create_client = lambda settings: FakeElasticsearch(catalog, latency=es_latency)
+
+    async def start_app() -> float:
+        start = time.perf_counter()
+        await main.startup()
+        elapsed = time.perf_counter() - start
+        if not readiness.ready:
+            raise RuntimeError(f"worker is not ready after startup: {readiness.checks}")
+        await main.shutdown()
+        return elapsed
+
+    return {"import": import_seconds, "startup": asyncio.run(start_app())}
+
+
+def run(args) -> dict:
+    command = [
+        sys.executable, "-m", "src.benchmarks.startup", "--child",
+        "--es-latency-ms", str(args.es_latency_ms), "--redis-latency-ms", str(args.redis_latency_ms),
+    ]
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run(command, cwd=ROOT, check=True, capture_output=True).stdout
+        runs.append(orjson.loads(output.splitlines()[-1]))
+    return {name: statistics.median(run_[name] for run_ in runs) * 1000 for name in METRICS}
+
+
+def best_report(reports: list[dict]) -> dict:
+    return {name: min(report[name] for report in reports) for name in METRICS}
+
+
+def print_report(report: dict) -> None:
+    for name, value in report.items():
+        print(f"{name:<10}{value:>10.1f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--es-latency-ms", type=float, default=2)
+    parser.add_argument("--redis-latency-ms", type=float, default=0.3)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение относительно эталона")
+    parser.add_argument("--reference", default="HEAD", help="ревизия git, с которой сравнивается текущее дерево")
+    parser.add_argument("--rounds", type=int, default=3, help="чередующихся раундов эталона и текущего дерева")
+    parser.add_argument("--baseline", type=Path, help="сравнить с сохранённым отчётом вместо эталонной ревизии")
+    parser.add_argument("--save-baseline", action="store_true", help="сохранить отчёт в --baseline")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.save_baseline and args.baseline is None:
+        parser.error("--save-baseline requires --baseline")
+
+    if args.child:
+        result = measure_once(args.es_latency_ms / 1000, args.redis_latency_ms / 1000)
+        sys.stdout.write(orjson.dumps(result).decode() + "\n")
+        return 0
+
+    if args.baseline is None:
+        options = [
+            "--runs", str(args.runs),
+            "--es-latency-ms", str(args.es_latency_ms), "--redis-latency-ms", str(args.redis_latency_ms),
+        ]
+        report, baseline = compare_with_reference(
+            "src.benchmarks.startup", args.reference, options, args.rounds, best_report
+        )
+        print(f"reference {args.reference}:")
+        print_report(baseline)
+        print("current tree:")
+        print_report(report)
+    else:
+        report = run(args)
+        print_report(report)
+        if args.save_baseline:
+            args.baseline.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+            print(f"baseline saved to {args.baseline}")
+            return 0
+        if not args.baseline.exists():
+            print(f"no baseline at {args.baseline}, run with --save-baseline to record one")
+            return 1
+        baseline = orjson.loads(args.baseline.read_bytes())
+
+    regressions = [
+        f"{name}: {report[name]:.1f} ms > baseline {expected:.1f} ms"
+        for name, expected in baseline.items()
+        if report[name] > expected * (1 + args.tolerance)
+    ]
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""Идентификатор клиента текущего запроса для лимитов на клиента.
+
+Клиентом считается IP: за nginx — из `X-Real-IP`, иначе адрес соединения.
+"""
+from contextvars import ContextVar
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+current_client: ContextVar[str] = ContextVar("client_id", default="anonymous")
+
+
+def client_id(scope: Scope) -> str:
+    headers = Headers(scope=scope)
+    real_ip = headers.get("x-real-ip")
+    if real_ip:
+        return real_ip
+    forwarded_for = headers.get("x-forwarded-for")
+    if forwarded_for:
+        return forwarded_for.split(",", 1)[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "anonymous"
+
+
+class ClientMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_client.set(client_id(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_client.reset(token)
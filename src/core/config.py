@@ -13,6 +13,27 @@ class AppBaseSettings(BaseSettings):
     es_host: str = Field(env="es_host")
     es_port: str = Field(env="es_port")
 
+    # Несколько узлов ES (JSON-список URL); если не задан, используется es_host:es_port
+    es_hosts: list[str] = Field([], env="es_hosts")
+    # Обновлять список узлов кластера при старте и при отказе узла
+    es_sniff_on_start: bool = Field(False, env="es_sniff_on_start")
+    es_sniff_on_node_failure: bool = Field(False, env="es_sniff_on_node_failure")
+    es_sniff_timeout: float = Field(1.0, env="es_sniff_timeout")
+    # Постоянных (keep-alive) соединений на узел в каждом воркере
+    es_connections_per_node: int = Field(20, env="es_connections_per_node")
+    es_request_timeout: float = Field(5.0, env="es_request_timeout")
+    es_max_retries: int = Field(2, env="es_max_retries")
+    es_retry_on_timeout: bool = Field(True, env="es_retry_on_timeout")
+    # Соединений на узел, открываемых при старте воркера до того, как он объявит готовность
+    es_min_connections: int = Field(4, env="es_min_connections")
+
+    # Соединений Redis в пуле воркера; при исчерпании запрос ждёт свободное не дольше redis_pool_timeout
+    redis_max_connections: int = Field(50, env="redis_max_connections")
+    redis_pool_timeout: float = Field(1.0, env="redis_pool_timeout")
+    redis_socket_timeout: float = Field(2.0, env="redis_socket_timeout")
+    redis_health_check_interval: int = Field(30, env="redis_health_check_interval")
+    redis_min_connections: int = Field(4, env="redis_min_connections")
+
 
 class AppDevSettings(AppBaseSettings):
     class Config:
@@ -59,5 +80,106 @@ ELASTIC_PORT = conn_params.params.es_port
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 FILM_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
-GENRE_CACHE_EXPIRE_IN_SECONDS = 60 * 5
 PERSON_CACHE_EXPIRE_IN_SECONDS = 60 * 5
+
+# Фасеты по всему каталогу (без фильтров) кэшируются отдельно от страниц
+FACETS_CACHE_EXPIRE_IN_SECONDS = 60 * 10
+
+# Кэш полнотекстового поиска: запрос кэшируется, если его повторили
+# SEARCH_CACHE_MIN_HITS раз за SEARCH_CACHE_ADMISSION_WINDOW секунд
+SEARCH_CACHE_EXPIRE_IN_SECONDS = 60
+SEARCH_CACHE_MIN_HITS = 2
+SEARCH_CACHE_ADMISSION_WINDOW = 60 * 10
+
+# Курсорная пагинация
+PIT_KEEP_ALIVE = "1m"
+ES_MAX_RESULT_WINDOW = 10000  # index.max_result_window по умолчанию
+# Размер страницы списка фильмов по умолчанию: его же использует прогрев кэша
+DEFAULT_PAGE_SIZE = 20
+
+# Максимум ID в одном запросе пакетных ручек
+BATCH_MAX_IDS = 100
+
+# Размер пачки документов при потоковой выгрузке индекса
+EXPORT_BATCH_SIZE = 1000
+
+# Подсказки при наборе: кэш префиксов в памяти процесса
+SUGGEST_CACHE_SIZE = 10_000
+SUGGEST_CACHE_EXPIRE_IN_SECONDS = 60
+
+# Справочник жанров в памяти перечитывается из ES с этим интервалом и по уведомлению ETL
+GENRE_CATALOG_REFRESH_SECONDS = 60 * 5
+
+# Канал Redis, в который ETL публикует ID загруженных документов
+ETL_EVENTS_CHANNEL = "etl:indexed"
+# Обработчик с `once` выполняет один воркер: он занимает событие ключом Redis на это время
+ETL_EVENT_CLAIM_SECONDS = 60
+
+# Cache-Control ответов: клиенты и nginx переиспользуют ответ это время,
+# а потом перепроверяют его по ETag
+CACHE_CONTROL_DETAILS = "public, max-age=300"
+CACHE_CONTROL_LISTS = "public, max-age=60"
+CACHE_CONTROL_SEARCH = "public, max-age=30"
+CACHE_CONTROL_REFERENCE = "public, max-age=300"
+CACHE_CONTROL_NO_STORE = "no-store"
+
+# Прогрев кэша при старте API и после загрузок ETL: первые страницы списка фильмов
+# в каждой сортировке, первая страница фильмов каждого жанра и детальные страницы топа
+WARMUP_SORTS = (None, "-imdb_rating", "imdb_rating")
+WARMUP_LIST_PAGES = 3
+WARMUP_TOP_FILMS = 100
+# Одновременных запросов прогрева на процесс — чтобы не отнимать ES у живых запросов
+WARMUP_CONCURRENCY = 2
+# Пачки ETL идут подряд; прогрев запускается один раз после паузы в уведомлениях
+WARMUP_DEBOUNCE_SECONDS = 10
+# Прогрев выполняет один воркер из всех, остальные видят блокировку в Redis
+WARMUP_LOCK_SECONDS = 60 * 5
+
+# Сжатие ответов: тела меньше порога отдаются как есть (как gzip_min_length в nginx).
+# Уровни выше, чем при сжатии на лету: кэшируемые ответы сжимаются один раз при записи в кэш
+COMPRESSION_MIN_SIZE = 1000
+COMPRESSION_LEVELS = {"gzip": 6, "br": 6, "zstd": 10}
+
+# Поиски, пришедшие за это окно, отправляются в ES одним _msearch (0 — отключить)
+MSEARCH_WINDOW_SECONDS = 0.002
+MSEARCH_MAX_BATCH = 32
+
+# Если при старте ES или Redis недоступны, подготовка воркера повторяется с этим интервалом
+READINESS_RETRY_SECONDS = 5
+
+# Дублирующие запросы к ES: копия отправляется, если запрос идёт дольше
+# HEDGE_PERCENTILE-го перцентиля последних HEDGE_WINDOW замеров (но не раньше HEDGE_MIN_DELAY_SECONDS)
+HEDGE_PERCENTILE = 95
+HEDGE_WINDOW = 1000
+HEDGE_MIN_SAMPLES = 100
+HEDGE_MIN_DELAY_SECONDS = 0.02
+
+# Бюджет задержки ручек: если ES не ответил за это время, отдаётся последняя
+# сохранённая версия ответа (копия `stale:` живёт STALE_CACHE_EXPIRE_IN_SECONDS)
+LATENCY_BUDGETS_SECONDS = {
+    "film": 0.2,
+    "films": 0.3,
+    "films_search": 0.5,
+    "persons": 0.3,
+}
+STALE_CACHE_EXPIRE_IN_SECONDS = 60 * 60 * 24
+
+# Лимиты запросов к ES по ручкам (только промахи кэша): (токенов в секунду, ёмкость ведра)
+# для ручки в целом и для одного клиента. Без токена запрос ждёт до RATE_LIMIT_MAX_WAIT_SECONDS,
+# затем получает старую версию ответа или 429
+RATE_LIMITS = {
+    "film": {"route": (500, 1000), "client": (20, 40)},
+    "films": {"route": (300, 600), "client": (10, 20)},
+    "films_search": {"route": (200, 400), "client": (5, 10)},
+    "persons": {"route": (200, 400), "client": (10, 20)},
+    "person": {"route": (500, 1000), "client": (20, 40)},
+    "person_films": {"route": (300, 600), "client": (10, 20)},
+    "film_similar": {"route": (200, 400), "client": (10, 20)},
+    "films_batch": {"route": (100, 200), "client": (5, 10)},
+    "persons_batch": {"route": (100, 200), "client": (5, 10)},
+}
+RATE_LIMIT_MAX_WAIT_SECONDS = 0.2
+
+# Похожие фильмы: размер подборки и время жизни в кэше (обновляется и по уведомлению ETL)
+SIMILAR_FILMS_SIZE = 10
+SIMILAR_CACHE_EXPIRE_IN_SECONDS = 60 * 60
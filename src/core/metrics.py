@@ -0,0 +1,138 @@
+"""Замеры фаз обработки запроса: заголовок `Server-Timing` и гистограммы Prometheus.
+
+Фазы (`cache`, `es`, `serialize`) отмечаются декоратором `timed` на методах
+кэша, клиента ES и сериализаторов и складываются в контекст текущего запроса.
+Вне запроса (фоновые задачи) замеры не ведутся.
+"""
+import functools
+import inspect
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Gauge, Histogram, generate_latest, multiprocess
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+REQUEST_DURATION = Histogram(
+    "api_request_duration_seconds",
+    "Время обработки запроса",
+    ["route", "cache"],
+)
+PHASE_DURATION = Histogram(
+    "api_request_phase_duration_seconds",
+    "Время фазы обработки запроса",
+    ["route", "phase", "cache"],
+)
+
+# Загрузка пулов соединений: занятые соединения против размера пула и ожидание свободного соединения
+ES_IN_FLIGHT = Gauge("es_requests_in_flight", "Запросы к ES в работе", multiprocess_mode="livesum")
+ES_POOL_SIZE = Gauge("es_pool_size", "Соединений ES в пулах: узлы × connections_per_node", multiprocess_mode="livesum")
+REDIS_POOL_IN_USE = Gauge("redis_pool_in_use", "Занятые соединения пула Redis", multiprocess_mode="livesum")
+REDIS_POOL_SIZE = Gauge("redis_pool_size", "Размер пула соединений Redis", multiprocess_mode="livesum")
+REDIS_POOL_WAIT = Histogram(
+    "redis_pool_wait_seconds",
+    "Ожидание соединения из пула Redis",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1),
+)
+
+
+class RequestMetrics:
+    __slots__ = ("timings", "cache")
+
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+        self.cache: str = "none"
+
+    def server_timing(self, total: float) -> str:
+        parts = [f"{name};dur={duration * 1000:.2f}" for name, duration in self.timings.items()]
+        parts.append(f'total;dur={total * 1000:.2f};desc="cache {self.cache}"')
+        return ", ".join(parts)
+
+
+current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def add_timing(name: str, duration: float) -> None:
+    metrics = current.get()
+    if metrics is not None:
+        metrics.timings[name] = metrics.timings.get(name, 0) + duration
+
+
+def mark_cache(hit: bool) -> None:
+    """Отмечает попадание или промах кэша; один промах за запрос делает весь запрос промахом."""
+    metrics = current.get()
+    if metrics is not None and metrics.cache != "miss":
+        metrics.cache = "hit" if hit else "miss"
+
+
+def timed(name: str):
+    """Прибавляет время вызова функции (синхронной или корутины) к фазе `name` текущего запроса."""
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    add_timing(name, time.perf_counter() - start)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add_timing(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+class TimingMiddleware:
+    """ASGI-middleware: заводит контекст замеров, добавляет `Server-Timing` и пишет гистограммы."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        start = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", metrics.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            total = time.perf_counter() - start
+            current.reset(token)
+            route = scope.get("route")
+            route = route.path if route is not None else "unmatched"
+            REQUEST_DURATION.labels(route, metrics.cache).observe(total)
+            for phase, duration in metrics.timings.items():
+                PHASE_DURATION.labels(route, phase, metrics.cache).observe(duration)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Метрики процесса, а под gunicorn — сумма по всем воркерам из общего каталога."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -2,6 +2,80 @@ from typing import Optional
 
 from elasticsearch import AsyncElasticsearch
 
+from src.core.config import MSEARCH_MAX_BATCH, MSEARCH_WINDOW_SECONDS, AppBaseSettings
+from src.core.metrics import ES_IN_FLIGHT, ES_POOL_SIZE, timed
+from src.db.hedging import Hedger
+from src.db.msearch import MsearchDispatcher
+
+
+class InstrumentedElasticsearch(AsyncElasticsearch):
+    """Клиент ES, время вызовов которого попадает в фазу `es` замеров запроса.
+
+    Поиски по индексу (не внутри point-in-time) объединяются в `_msearch`
+    диспетчером, если окно `MSEARCH_WINDOW_SECONDS` больше нуля. Медленные
+    `search`, `get` и `mget` дублируются на другие копии шардов (см. `hedging`).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dispatcher: Optional[MsearchDispatcher] = None
+        if MSEARCH_WINDOW_SECONDS > 0:
+            self.dispatcher = MsearchDispatcher(super().msearch, MSEARCH_WINDOW_SECONDS, MSEARCH_MAX_BATCH)
+        self.hedgers = {operation: Hedger(operation) for operation in ("search", "get", "mget")}
+
+    async def perform_request(self, *args, **kwargs):
+        """Через этот метод идут все вызовы API клиента, включая `_msearch` диспетчера."""
+        ES_IN_FLIGHT.inc()
+        try:
+            return await super().perform_request(*args, **kwargs)
+        finally:
+            ES_IN_FLIGHT.dec()
+
+    @timed("es")
+    async def search(self, **kwargs):
+        if "pit" in kwargs:
+            # Внутри point-in-time `preference` не допускается, такие поиски не дублируются
+            return await super().search(**kwargs)
+        return await self.hedgers["search"].call(self._search, **kwargs)
+
+    async def _search(self, **kwargs):
+        if self.dispatcher is not None:
+            return await self.dispatcher.search(**kwargs)
+        return await super().search(**kwargs)
+
+    @timed("es")
+    async def get(self, **kwargs):
+        return await self.hedgers["get"].call(super().get, **kwargs)
+
+    @timed("es")
+    async def mget(self, **kwargs):
+        return await self.hedgers["mget"].call(super().mget, **kwargs)
+
+    @timed("es")
+    async def open_point_in_time(self, **kwargs):
+        return await super().open_point_in_time(**kwargs)
+
+    @timed("es")
+    async def close_point_in_time(self, **kwargs):
+        return await super().close_point_in_time(**kwargs)
+
+
+def create_client(settings: AppBaseSettings) -> InstrumentedElasticsearch:
+    hosts = settings.es_hosts or [f"{settings.es_host}:{settings.es_port}"]
+    ES_POOL_SIZE.inc(len(hosts) * settings.es_connections_per_node)
+    return InstrumentedElasticsearch(
+        hosts=hosts,
+        verify_certs=False,
+        connections_per_node=settings.es_connections_per_node,
+        request_timeout=settings.es_request_timeout,
+        max_retries=settings.es_max_retries,
+        retry_on_timeout=settings.es_retry_on_timeout,
+        sniff_on_start=settings.es_sniff_on_start,
+        sniff_on_node_failure=settings.es_sniff_on_node_failure,
+        sniff_timeout=settings.es_sniff_timeout,
+    )
+
+
 es: Optional[AsyncElasticsearch] = None
 
 
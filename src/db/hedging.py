@@ -0,0 +1,73 @@
+"""Дублирующие (hedged) запросы к ES против хвостовых задержек.
+
+Если запрос не ответил за время, превышающее `HEDGE_PERCENTILE`-й перцентиль
+недавних задержек этой операции, отправляется его копия с другим значением
+`preference`: ES направит её на другие копии шардов. Используется ответ,
+пришедший первым, второй запрос отменяется. Пока замеров меньше
+`HEDGE_MIN_SAMPLES`, копии не отправляются.
+"""
+import asyncio
+import time
+import uuid
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from prometheus_client import Counter
+
+from src.core.config import HEDGE_MIN_DELAY_SECONDS, HEDGE_MIN_SAMPLES, HEDGE_PERCENTILE, HEDGE_WINDOW
+
+ES_HEDGED_REQUESTS = Counter("es_hedged_requests", "Отправленные копии запросов к ES", ["operation"])
+ES_HEDGE_WINS = Counter("es_hedge_wins", "Копии запросов к ES, ответившие раньше исходного", ["operation"])
+
+# Порог перцентиля пересчитывается раз в столько замеров, а не на каждом запросе
+RECALCULATE_EVERY = 50
+
+
+class Hedger:
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.latencies: deque[float] = deque(maxlen=HEDGE_WINDOW)
+        self.threshold: Optional[float] = None
+        self._since_recalculation = 0
+
+    def record(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+        self._since_recalculation += 1
+        if len(self.latencies) >= HEDGE_MIN_SAMPLES and self._since_recalculation >= RECALCULATE_EVERY:
+            self._since_recalculation = 0
+            ordered = sorted(self.latencies)
+            percentile = ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE / 100))]
+            self.threshold = max(HEDGE_MIN_DELAY_SECONDS, percentile)
+
+    async def call(self, request: Callable[..., Awaitable], **kwargs):
+        """Выполняет `request(**kwargs)`, а при долгом ответе — ещё и его копию с `preference`."""
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(request(**kwargs))
+        # Исходный запрос, отменённый после победы копии, тоже даёт замер: время до отмены больше
+        # порога и служит нижней границей его задержки. Без таких замеров из окна уходит хвост,
+        # перцентиль падает и копий становится всё больше.
+        primary.add_done_callback(lambda _: self.record(time.perf_counter() - start))
+        if self.threshold is None:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.threshold)
+            if done:
+                return primary.result()
+
+            ES_HEDGED_REQUESTS.labels(self.operation).inc()
+            hedge = asyncio.ensure_future(request(**kwargs, preference=f"hedge-{uuid.uuid4().hex}"))
+            tasks.add(hedge)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            ES_HEDGE_WINS.labels(self.operation).inc()
+                        return task.result()
+            return primary.result()  # оба запроса упали: поднимаем ошибку исходного
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,88 @@
+import asyncio
+import inspect
+import re
+import sys
+
+from src.benchmarks.env import setup_env
+
+setup_env()
+
+from src.core.config import HEDGE_MIN_DELAY_SECONDS, HEDGE_MIN_SAMPLES  # noqa: E402
+from src.db.hedging import RECALCULATE_EVERY, Hedger  # noqa: E402
+
+FAST = 0.001
+SLOW = 0.2
+THRESHOLD = HEDGE_MIN_DELAY_SECONDS * 2
+
+
+class FakeRequest:
+    """Каждый `slow_every`-й исходный запрос отвечает за SLOW, копии с `preference` — сразу."""
+
+    def __init__(self, slow_every):
+        self.slow_every = slow_every
+        self.primaries = 0
+        self.hedges = 0
+
+    async def __call__(self, preference=None):
+        if preference is not None:
+            self.hedges += 1
+            await asyncio.sleep(FAST)
+            return "hedge"
+        self.primaries += 1
+        await asyncio.sleep(SLOW if self.primaries % self.slow_every == 0 else FAST)
+        return "primary"
+
+
+def calls(hedger, request, count):
+    async def run():
+        return await asyncio.gather(*(hedger.call(request) for _ in range(count)))
+
+    return asyncio.run(run())
+
+
+def test_no_hedging_before_enough_samples():
+    hedger = Hedger("search")
+    request = FakeRequest(slow_every=2)
+
+    assert calls(hedger, request, 4) == ["primary"] * 4
+    assert request.hedges == 0
+
+
+def test_slow_primary_is_hedged():
+    hedger = Hedger("search")
+    hedger.threshold = THRESHOLD
+    request = FakeRequest(slow_every=1)
+
+    assert calls(hedger, request, 1) == ["hedge"]
+    assert request.hedges == 1
+
+
+def test_cancelled_primary_is_recorded_as_lower_bound():
+    hedger = Hedger("search")
+    hedger.threshold = THRESHOLD
+    calls(hedger, FakeRequest(slow_every=1), 1)
+
+    assert len(hedger.latencies) == 1
+    assert hedger.latencies[0] >= THRESHOLD
+
+
+def test_threshold_keeps_tail_under_hedging():
+    """Каждый десятый запрос медленный: p95 должен остаться в хвосте, а не упасть до быстрых ответов."""
+    hedger = Hedger("search")
+    hedger.threshold = THRESHOLD
+    request = FakeRequest(slow_every=10)
+
+    calls(hedger, request, HEDGE_MIN_SAMPLES + RECALCULATE_EVERY)
+
+    assert request.hedges > 0
+    assert hedger.threshold >= THRESHOLD
+
+
+def run_tests(pattern="test_*"):
+    search_pattern = re.compile(pattern)
+    for name, func in inspect.getmembers(sys.modules[__name__]):
+        if search_pattern.match(name):
+            func()
+
+
+run_tests()
@@ -0,0 +1,125 @@
+"""Объединение одновременных поисковых запросов в один `_msearch`.
+
+Поиски, пришедшие в течение `window` секунд, копятся в очереди и уходят одним
+HTTP-запросом, как только истекло окно или набралось `max_batch` поисков.
+Каждый ответ из `responses` возвращается своей ожидающей корутине в том же
+виде, что и ответ обычного `search`; ошибка отдельного поиска поднимается
+тем же исключением клиента ES, что и при одиночном запросе.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from elasticsearch import ApiError
+from elasticsearch.exceptions import HTTP_EXCEPTIONS
+from prometheus_client import Histogram
+
+MSEARCH_BATCH_SIZE = Histogram(
+    "es_msearch_batch_size",
+    "Число поисков в одном запросе _msearch",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+MSEARCH_DELAY = Histogram(
+    "es_msearch_delay_seconds",
+    "Задержка поиска в очереди до отправки _msearch",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05),
+)
+
+
+@dataclass
+class PendingSearch:
+    header: dict
+    body: dict
+    filter_path: Optional[list[str]]
+    future: asyncio.Future
+    enqueued: float = field(default_factory=time.perf_counter)
+
+
+def batch_filter_path(batch: list[PendingSearch]) -> Optional[list[str]]:
+    """`filter_path` применяется ко всему ответу `_msearch`, поэтому берётся объединение путей всех поисков."""
+    if any(search.filter_path is None for search in batch):
+        return None
+    paths = {f"responses.{path}" for search in batch for path in search.filter_path}
+    return sorted(paths | {"responses.status", "responses.error"})
+
+
+def search_error(item: dict, meta) -> ApiError:
+    status = item.get("status", 500)
+    error = item["error"]
+    message = error.get("type", "search_error") if isinstance(error, dict) else str(error)
+    return HTTP_EXCEPTIONS.get(status, ApiError)(message=message, meta=meta, body=item)
+
+
+class MsearchDispatcher:
+    def __init__(self, msearch: Callable[..., Awaitable], window: float, max_batch: int):
+        self._msearch = msearch
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: list[PendingSearch] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sending: set[asyncio.Task] = set()
+
+    async def search(
+        self,
+        *,
+        index: str,
+        filter_path: Optional[list[str]] = None,
+        source_includes: Optional[list[str]] = None,
+        source=None,
+        from_: Optional[int] = None,
+        preference: Optional[str] = None,
+        **body,
+    ) -> dict:
+        """Принимает те же аргументы, что и `AsyncElasticsearch.search` без point-in-time."""
+        header = {"index": index}
+        if preference is not None:
+            header["preference"] = preference
+        if source is not None:
+            body["_source"] = source
+        if source_includes is not None:
+            body["_source"] = {"includes": source_includes}
+        if from_ is not None:
+            body["from"] = from_
+
+        loop = asyncio.get_running_loop()
+        pending = PendingSearch(header=header, body=body, filter_path=filter_path, future=loop.create_future())
+        self._pending.append(pending)
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await pending.future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: list[PendingSearch]) -> None:
+        sent = time.perf_counter()
+        MSEARCH_BATCH_SIZE.observe(len(batch))
+        for search in batch:
+            MSEARCH_DELAY.observe(sent - search.enqueued)
+
+        searches = [part for search in batch for part in (search.header, search.body)]
+        try:
+            response = await self._msearch(searches=searches, filter_path=batch_filter_path(batch))
+        except Exception as error:
+            for search in batch:
+                if not search.future.done():
+                    search.future.set_exception(error)
+            return
+
+        for search, item in zip(batch, response["responses"]):
+            if search.future.done():
+                continue
+            if "error" in item:
+                search.future.set_exception(search_error(item, response.meta))
+            else:
+                search.future.set_result(item)
@@ -0,0 +1,119 @@
+import asyncio
+import inspect
+import re
+import sys
+from types import SimpleNamespace
+
+from elasticsearch import BadRequestError, ConnectionError, NotFoundError
+
+from src.db.msearch import MsearchDispatcher, PendingSearch, batch_filter_path
+
+
+class FakeResponse(dict):
+    meta = SimpleNamespace(status=200)
+
+
+class FakeMsearch:
+    """Отвечает на каждый поиск его телом либо ошибкой из `errors` по имени индекса."""
+
+    def __init__(self, errors=None, fail=None):
+        self.calls = []
+        self.errors = errors or {}
+        self.fail = fail
+
+    async def __call__(self, searches, filter_path):
+        self.calls.append({"searches": searches, "filter_path": filter_path})
+        if self.fail is not None:
+            raise self.fail
+        responses = []
+        for header, body in zip(searches[::2], searches[1::2]):
+            error = self.errors.get(header["index"])
+            responses.append(error if error is not None else {"status": 200, "index": header["index"], "body": body})
+        return FakeResponse(responses=responses)
+
+
+def pending(filter_path):
+    return PendingSearch(header={}, body={}, filter_path=filter_path, future=None)
+
+
+def run_searches(msearch, searches, window=0.01, max_batch=32):
+    async def run():
+        dispatcher = MsearchDispatcher(msearch, window=window, max_batch=max_batch)
+        return await asyncio.wait_for(
+            asyncio.gather(*(dispatcher.search(**search) for search in searches), return_exceptions=True), 1
+        )
+
+    return asyncio.run(run())
+
+
+def test_concurrent_searches_share_one_msearch():
+    msearch = FakeMsearch()
+    results = run_searches(msearch, [{"index": "movies", "size": 1}, {"index": "persons", "size": 2}])
+
+    assert len(msearch.calls) == 1
+    assert [result["index"] for result in results] == ["movies", "persons"]
+    assert [result["body"] for result in results] == [{"size": 1}, {"size": 2}]
+
+
+def test_full_batch_is_sent_before_window():
+    msearch = FakeMsearch()
+    results = run_searches(msearch, [{"index": "movies"}] * 3, window=60, max_batch=3)
+
+    assert len(msearch.calls) == 1
+    assert len(results) == 3
+
+
+def test_search_options_go_to_header_and_body():
+    msearch = FakeMsearch()
+    run_searches(
+        msearch,
+        [{"index": "movies", "preference": "hedge", "source_includes": ["id"], "from_": 20, "size": 10}],
+    )
+
+    header, body = msearch.calls[0]["searches"]
+    assert header == {"index": "movies", "preference": "hedge"}
+    assert body == {"_source": {"includes": ["id"]}, "from": 20, "size": 10}
+
+
+def test_item_error_goes_to_its_search_only():
+    msearch = FakeMsearch(
+        errors={
+            "missing": {"status": 404, "error": {"type": "index_not_found_exception"}},
+            "bad": {"status": 400, "error": "parse error"},
+        }
+    )
+    ok, missing, bad = run_searches(msearch, [{"index": "movies"}, {"index": "missing"}, {"index": "bad"}])
+
+    assert ok["index"] == "movies"
+    assert isinstance(missing, NotFoundError)
+    assert isinstance(bad, BadRequestError)
+
+
+def test_transport_error_goes_to_every_search():
+    error = ConnectionError("connection refused")
+    results = run_searches(FakeMsearch(fail=error), [{"index": "movies"}, {"index": "persons"}])
+
+    assert results == [error, error]
+
+
+def test_filter_path_is_union_of_searches():
+    assert batch_filter_path([pending(["hits.hits._source"]), pending(["aggregations"])]) == [
+        "responses.aggregations",
+        "responses.error",
+        "responses.hits.hits._source",
+        "responses.status",
+    ]
+
+
+def test_no_filter_path_if_any_search_needs_full_response():
+    assert batch_filter_path([pending(["hits.hits._source"]), pending(None)]) is None
+
+
+def run_tests(pattern="test_*"):
+    search_pattern = re.compile(pattern)
+    for name, func in inspect.getmembers(sys.modules[__name__]):
+        if search_pattern.match(name):
+            func()
+
+
+run_tests()
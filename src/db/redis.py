@@ -1,8 +1,61 @@
+import time
 from typing import Optional
 
-from redis.asyncio import Redis
+from redis.asyncio import BlockingConnectionPool, Redis
+
+from src.core.config import AppBaseSettings
+from src.core.metrics import REDIS_POOL_IN_USE, REDIS_POOL_SIZE, REDIS_POOL_WAIT
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """Пул ограниченного размера: при исчерпании запрос ждёт соединение, а не открывает новое.
+
+    Ожидание соединения и число занятых соединений попадают в метрики.
+    """
+
+    async def get_connection(self, command_name, *keys, **options):
+        start = time.perf_counter()
+        connection = await super().get_connection(command_name, *keys, **options)
+        REDIS_POOL_WAIT.observe(time.perf_counter() - start)
+        REDIS_POOL_IN_USE.inc()
+        return connection
+
+    async def release(self, connection):
+        REDIS_POOL_IN_USE.dec()
+        await super().release(connection)
+
+
+def create_client(settings: AppBaseSettings) -> Redis:
+    REDIS_POOL_SIZE.inc(settings.redis_max_connections)
+    pool = InstrumentedConnectionPool(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        max_connections=settings.redis_max_connections,
+        timeout=settings.redis_pool_timeout,
+        socket_timeout=settings.redis_socket_timeout,
+        socket_connect_timeout=settings.redis_socket_timeout,
+        socket_keepalive=True,
+        health_check_interval=settings.redis_health_check_interval,
+        retry_on_timeout=True,
+    )
+    return Redis(connection_pool=pool)
+
+
+def create_subscriber(settings: AppBaseSettings) -> Redis:
+    """Отдельный клиент для pub/sub: чтение подписки блокируется до прихода сообщения,
+    поэтому `socket_timeout` общего пула оборвал бы его при каждом простое канала."""
+    return Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        socket_timeout=None,
+        socket_connect_timeout=settings.redis_socket_timeout,
+        socket_keepalive=True,
+        health_check_interval=settings.redis_health_check_interval,
+    )
+
 
 redis: Optional[Redis] = None
+subscriber: Optional[Redis] = None
 
 
 # Функция понадобится при внедрении зависимостей
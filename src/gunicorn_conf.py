@@ -0,0 +1,62 @@
+"""Настройки gunicorn для продакшена.
+
+Приложение импортируется один раз в мастер-процессе (`preload_app`) и
+форкается в воркеры, поэтому модули, модели pydantic и роуты воркеры делят
+через copy-on-write. Клиенты ES и Redis создаются в `startup()` уже в каждом
+воркере: соединения и event loop нельзя переносить через fork.
+
+Запуск: `gunicorn -c src/gunicorn_conf.py src.main:app` из корня проекта.
+"""
+import math
+import os
+import shutil
+from pathlib import Path
+
+# Метрики Prometheus собираются со всех воркеров через общий каталог. Файл настроек
+# читается до `preload_app`, а метрики без меток открывают свои файлы уже при импорте
+# приложения, поэтому каталог очищается от прошлого запуска и создаётся здесь.
+prometheus_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus")
+shutil.rmtree(prometheus_dir, ignore_errors=True)
+os.makedirs(prometheus_dir, exist_ok=True)
+
+
+def container_cpus() -> int:
+    """Процессоры, доступные контейнеру: привязка процесса, ограниченная квотой CPU в cgroup."""
+    cpus = len(os.sched_getaffinity(0))
+    try:
+        # cgroup v2: "<квота> <период>" или "max <период>"
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: квота -1 означает отсутствие ограничения
+            quota = Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text().strip()
+            period = Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text().strip()
+        except OSError:
+            return cpus
+    if quota in ("max", "-1"):
+        return cpus
+    return max(1, min(cpus, math.ceil(int(quota) / int(period))))
+
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '80')}"
+# UvicornWorker сам выбирает uvloop и httptools, если они установлены
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", container_cpus()))
+preload_app = True
+
+keepalive = 5
+timeout = 60
+graceful_timeout = 30
+# Периодический перезапуск воркеров со случайным разбросом, чтобы они не перезапускались одновременно
+max_requests = int(os.getenv("MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", 1000))
+
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
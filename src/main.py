@@ -1,18 +1,22 @@
+import asyncio
 import os
 
 import uvicorn
-from elasticsearch import AsyncElasticsearch, Elasticsearch
-from fastapi import FastAPI, Request, Response, status
+from fastapi import FastAPI, Request, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import ORJSONResponse
-from fastapi_redis_cache import FastApiRedisCache
 from pydantic import ValidationError
-from redis.asyncio import Redis
 from starlette.responses import JSONResponse
 
 from src.api.v1 import films, genres, persons
 from src.core import config
+from src.core.client import ClientMiddleware
+from src.core.metrics import TimingMiddleware, metrics_endpoint
 from src.db import elastic, redis
+from src.services import etl_events
+from src.services.genre import catalog as genre_catalog
+from src.services.readiness import liveness_endpoint, readiness, readiness_endpoint
+from src.services.warmup import warmer
 
 app = FastAPI(
     title=config.PROJECT_NAME,
@@ -22,6 +26,10 @@ app = FastAPI(
 )
 
 
+# Фоновые задачи процесса: обновление справочников и подписка на уведомления ETL
+background_tasks: list[asyncio.Task] = []
+
+
 @app.exception_handler(ValidationError)
 async def validation_exception_handler(request: Request, exc: ValidationError):
     return JSONResponse(
@@ -32,24 +40,44 @@ async def validation_exception_handler(request: Request, exc: ValidationError):
 
 @app.on_event("startup")
 async def startup():
-    redis.redis = Redis(host=config.REDIS_HOST, port=config.REDIS_PORT)
-    elastic.es = AsyncElasticsearch(hosts=[f"{config.ELASTIC_HOST}:{config.ELASTIC_PORT}"], verify_certs=False)
-
-    redis_cache = FastApiRedisCache()
-    redis_cache.init(
-        host_url=f"redis://{config.REDIS_HOST}:{config.REDIS_PORT}",
-        prefix="myapi-cache",
-        response_header="X-MyAPI-Cache",
-        ignore_arg_types=[Request, Response],
+    # Выполняется в каждом воркере после fork: у каждого свои пулы соединений
+    settings = config.conn_params.params
+    redis.redis = redis.create_client(settings)
+    redis.subscriber = redis.create_subscriber(settings)
+    elastic.es = elastic.create_client(settings)
+
+    # Соединения и справочники готовятся до первого запроса; если ES или Redis ещё
+    # недоступны, подготовка продолжается в фоне, а /health/ready отвечает 503
+    await readiness.prepare(redis.redis, elastic.es, settings)
+    if not readiness.ready:
+        background_tasks.append(asyncio.create_task(readiness.prepare_until_ready(redis.redis, elastic.es, settings)))
+
+    background_tasks.extend(
+        [
+            asyncio.create_task(genre_catalog.refresh_periodically(elastic.es)),
+            asyncio.create_task(etl_events.listen(redis.redis, redis.subscriber, elastic.es)),
+        ]
     )
+    # Прогрев кэша идёт в фоне и не задерживает готовность воркера
+    warmer.schedule(redis.redis, elastic.es)
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    warmer.cancel()
+    for task in background_tasks:
+        task.cancel()
     await redis.redis.close()
+    await redis.subscriber.close()
     await elastic.es.close()
 
 
+app.add_middleware(ClientMiddleware)
+app.add_middleware(TimingMiddleware)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+app.add_route("/health/ready", readiness_endpoint, include_in_schema=False)
+app.add_route("/health/live", liveness_endpoint, include_in_schema=False)
+
 app.include_router(films.router, prefix="/api/v1/films", tags=["films"])
 app.include_router(genres.router, prefix="/api/v1/genres", tags=["genres"])
 app.include_router(persons.router, prefix="/api/v1/persons", tags=["persons"])
@@ -57,7 +85,9 @@ app.include_router(persons.router, prefix="/api/v1/persons", tags=["persons"])
 if __name__ == "__main__":
     if os.environ.get("ENV", "dev") == "dev":
         uvicorn.run(
-            "main:app",
+            "src.main:app",
             host="0.0.0.0",
             port=8000,
+            loop="uvloop",
+            http="httptools",
         )
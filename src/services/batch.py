@@ -0,0 +1,51 @@
+"""Пакетное получение документов по списку ID.
+
+Попадания в кэш читаются одним конвейером HGET, промахи — одним `mget` в ES,
+а свежие тела дописываются в кэш одним конвейером.
+"""
+from typing import Awaitable, Callable, Optional
+
+from elasticsearch import AsyncElasticsearch
+
+from src.services.cache import ResponseBody, ResponseCache
+
+
+async def get_details_by_ids(
+    cache: ResponseCache,
+    elastic: AsyncElasticsearch,
+    index: str,
+    key_prefix: str,
+    ids: list[str],
+    source_includes: list[str],
+    serialize: Callable[[dict], bytes],
+    expire: int,
+    variant: str,
+    refresh: bool = False,
+    before_fetch: Optional[Callable[[], Awaitable[None]]] = None,
+) -> ResponseBody:
+    """Возвращает JSON-массив тел детальных ответов в порядке `ids`; отсутствующие в базе документы пропускаются.
+
+    Тело документа хранится полем `variant` (набор полей ответа) хеша `{key_prefix}:{id}:fields`.
+    С `refresh` кэш не читается: все документы берутся из ES и перезаписываются в кэше.
+    `before_fetch` вызывается перед запросом в ES, только если в кэше нашлись не все документы, — например, лимит.
+    """
+    ids = list(dict.fromkeys(ids))
+    if refresh:
+        found = dict.fromkeys(ids)
+    else:
+        keys = [f"{key_prefix}:{id_}:fields" for id_ in ids]
+        found = dict(zip(ids, await cache.get_many_variants(keys, variant)))
+
+    missing = [id_ for id_, body in found.items() if body is None]
+    if missing:
+        if before_fetch is not None:
+            await before_fetch()
+        docs = await elastic.mget(index=index, ids=missing, source_includes=source_includes)
+        fetched = {doc["_id"]: ResponseBody(serialize(doc["_source"])) for doc in docs["docs"] if doc.get("found")}
+        if fetched:
+            await cache.set_many_variants(
+                {f"{key_prefix}:{id_}:fields": body for id_, body in fetched.items()}, variant, expire
+            )
+        found.update(fetched)
+
+    return ResponseBody(b"[" + b",".join(body.content for body in found.values() if body is not None) + b"]")
@@ -0,0 +1,104 @@
+"""Бюджет задержки и лимит частоты запроса к ES.
+
+Если ответ из ES не пришёл за бюджет ручки, отдаётся последняя сохранённая
+версия ответа (`stale:` копия в кэше). Запрос к ES при этом не отменяется:
+он доходит в фоне и обновляет кэш. Если старой версии нет, ответ ждётся
+до конца.
+
+Перед запросом к ES берётся токен `RequestLimiter`. Если его не дали,
+отдаётся старая версия ответа, а без неё — 429. Запросы без кэша и старых
+версий (point-in-time, детальные данные персонажей, пакетные ручки) проходят
+только через лимит: `rate_limited` и `acquire_or_reject`.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException, status
+from prometheus_client import Counter
+
+from src.core.config import LATENCY_BUDGETS_SECONDS
+from src.services.cache import ResponseBody
+from src.services.ratelimit import RequestLimiter
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUDGET_EXCEEDED = Counter(
+    "api_latency_budget_exceeded",
+    "Запросы к ES, не уложившиеся в бюджет ручки: отдана старая версия или ответ дождались",
+    ["route", "outcome"],
+)
+RATE_LIMITED = Counter(
+    "api_rate_limited",
+    "Запросы без токена лимита: отдана старая версия или отклонены с 429",
+    ["route", "outcome"],
+)
+
+# Запросы, доходящие в фоне после ответа клиенту старой версией
+background: set[asyncio.Task] = set()
+
+
+def _finish_in_background(task: asyncio.Task) -> None:
+    background.add(task)
+
+    def done(task_: asyncio.Task) -> None:
+        background.discard(task_)
+        if not task_.cancelled() and task_.exception() is not None:
+            logger.warning("Background refresh after exceeded latency budget failed: %r", task_.exception())
+
+    task.add_done_callback(done)
+
+
+def _reject(route: str) -> HTTPException:
+    RATE_LIMITED.labels(route, "rejected").inc()
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="too many requests", headers={"Retry-After": "1"}
+    )
+
+
+async def acquire_or_reject(route: str, limiter: RequestLimiter) -> None:
+    """Берёт токен лимита ручки `route`; без токена — 429."""
+    if not await limiter.acquire(route):
+        raise _reject(route)
+
+
+async def rate_limited(
+    route: str, limiter: RequestLimiter, fetch: Awaitable[Optional[ResponseBody]]
+) -> Optional[ResponseBody]:
+    """Ответ `fetch` после получения токена; старой версии у таких запросов нет, поэтому без токена — 429."""
+    try:
+        await acquire_or_reject(route, limiter)
+    except HTTPException:
+        fetch.close()
+        raise
+    return await fetch
+
+
+async def within_budget(
+    route: str,
+    limiter: RequestLimiter,
+    fetch: Awaitable[Optional[ResponseBody]],
+    stale: Callable[[], Awaitable[Optional[ResponseBody]]],
+) -> Optional[ResponseBody]:
+    """Ответ `fetch`, а если он не готов за `LATENCY_BUDGETS_SECONDS[route]` — результат `stale()`, если он есть."""
+    if not await limiter.acquire(route):
+        fetch.close()
+        body = await stale()
+        if body is None:
+            raise _reject(route)
+        RATE_LIMITED.labels(route, "stale").inc()
+        return body
+
+    task = asyncio.ensure_future(fetch)
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), LATENCY_BUDGETS_SECONDS[route])
+    except asyncio.TimeoutError:
+        pass
+
+    body = await stale()
+    if body is None:
+        LATENCY_BUDGET_EXCEEDED.labels(route, "waited").inc()
+        return await task
+    LATENCY_BUDGET_EXCEEDED.labels(route, "stale").inc()
+    _finish_in_background(task)
+    return body
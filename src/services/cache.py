@@ -0,0 +1,207 @@
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+import orjson
+from redis.asyncio import Redis
+
+from src.core.config import COMPRESSION_MIN_SIZE
+from src.core.metrics import mark_cache, timed
+from src.services import compression
+
+
+@dataclass
+class ResponseBody:
+    """Готовое тело ответа API и заголовки, которые к нему относятся (например, курсор следующей страницы).
+
+    `encoded` — уже сжатые варианты тела по кодировкам; они хранятся в кэше рядом с исходным телом.
+    """
+
+    content: bytes
+    headers: dict[str, str] = field(default_factory=dict)
+    encoded: dict[str, bytes] = field(default_factory=dict)
+
+    def __post_init__(self):
+        """ETag считается один раз при сборке тела и дальше хранится в кэше вместе с ним."""
+        if "ETag" not in self.headers:
+            self.headers["ETag"] = f'"{hashlib.blake2b(self.content, digest_size=16).hexdigest()}"'
+
+    @property
+    def etag(self) -> str:
+        return self.headers["ETag"]
+
+    @property
+    def compressible(self) -> bool:
+        return len(self.content) >= COMPRESSION_MIN_SIZE
+
+    def encode(self, encoding: str) -> bytes:
+        """Тело в кодировке `encoding`; сжатие выполняется один раз на объект."""
+        if encoding not in self.encoded:
+            self.encoded[encoding] = compression.compress(self.content, encoding)
+        return self.encoded[encoding]
+
+    def precompress(self) -> None:
+        """Готовит все доступные сжатые варианты перед записью в кэш."""
+        if self.compressible:
+            for encoding in compression.CODECS:
+                self.encode(encoding)
+
+    def dumps(self) -> bytes:
+        """Формат записи в кэше: JSON с заголовками и длинами сжатых вариантов, перевод строки,
+        тело как есть и следом сжатые варианты."""
+        meta = {"headers": self.headers, "encoded": {name: len(data) for name, data in self.encoded.items()}}
+        return orjson.dumps(meta) + b"\n" + self.content + b"".join(self.encoded.values())
+
+    @classmethod
+    def loads(cls, data: bytes) -> "ResponseBody":
+        meta, payload = data.split(b"\n", 1)
+        meta = orjson.loads(meta)
+        if "encoded" not in meta:
+            # Запись старого формата: только заголовки и тело
+            return cls(content=payload, headers=meta)
+        encoded = {}
+        end = len(payload)
+        for name, length in reversed(meta["encoded"].items()):
+            encoded[name] = payload[end - length:end]
+            end -= length
+        return cls(content=payload[:end], headers=meta["headers"], encoded=encoded)
+
+
+class ResponseCache:
+    """Кэш готовых тел ответов API в Redis.
+
+    Хранит уже сериализованный JSON, поэтому при попадании в кэш ответ
+    отдаётся как есть, без разбора и повторной сборки pydantic-моделей.
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    @timed("cache")
+    async def get(self, key: str) -> Optional[ResponseBody]:
+        data = await self.redis.get(key)
+        mark_cache(data is not None)
+        if data is None:
+            return None
+        return ResponseBody.loads(data)
+
+    @timed("cache")
+    async def set(self, key: str, body: ResponseBody, expire: int, stale_expire: Optional[int] = None) -> None:
+        """С `stale_expire` рядом пишется долгоживущая копия `stale:{key}` для ответа при превышении бюджета задержки."""
+        body.precompress()
+        data = body.dumps()
+        if stale_expire is None:
+            await self.redis.set(key, data, ex=expire)
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(key, data, ex=expire)
+            pipe.set(f"stale:{key}", data, ex=stale_expire)
+            await pipe.execute()
+
+    @timed("cache")
+    async def get_stale(self, key: str) -> Optional[ResponseBody]:
+        data = await self.redis.get(f"stale:{key}")
+        return ResponseBody.loads(data) if data is not None else None
+
+    @timed("cache")
+    async def get_variant(self, key: str, variant: str) -> Optional[ResponseBody]:
+        data = await self.redis.hget(key, variant)
+        mark_cache(data is not None)
+        if data is None:
+            return None
+        return ResponseBody.loads(data)
+
+    @timed("cache")
+    async def get_stale_variant(self, key: str, variant: str) -> Optional[ResponseBody]:
+        data = await self.redis.hget(f"stale:{key}", variant)
+        return ResponseBody.loads(data) if data is not None else None
+
+    @timed("cache")
+    async def set_variant(
+        self, key: str, variant: str, body: ResponseBody, expire: int, stale_expire: Optional[int] = None
+    ) -> None:
+        """Варианты ответа об одном документе (наборы полей) хранятся полями хеша `key`, поэтому удаляются одним DEL.
+
+        TTL ставится хешу при первой записи и следующими вариантами не продлевается:
+        ни один вариант не живёт дольше `expire`.
+        """
+        body.precompress()
+        data = body.dumps()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, variant, data)
+            pipe.expire(key, expire, nx=True)
+            if stale_expire is not None:
+                pipe.hset(f"stale:{key}", variant, data)
+                pipe.expire(f"stale:{key}", stale_expire, nx=True)
+            await pipe.execute()
+
+    @timed("cache")
+    async def get_many_variants(self, keys: list[str], variant: str) -> list[Optional[ResponseBody]]:
+        """Читает вариант `variant` из нескольких хешей одним конвейером HGET."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hget(key, variant)
+            values = await pipe.execute()
+        mark_cache(all(data is not None for data in values))
+        return [ResponseBody.loads(data) if data is not None else None for data in values]
+
+    @timed("cache")
+    async def set_many_variants(self, bodies: dict[str, ResponseBody], variant: str, expire: int) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, body in bodies.items():
+                body.precompress()
+                pipe.hset(key, variant, body.dumps())
+                pipe.expire(key, expire, nx=True)
+            await pipe.execute()
+
+
+class CacheAdmission:
+    """Политика допуска в кэш: ключ попадает в кэш, только если к нему обратились
+    не меньше `min_hits` раз за `window` секунд.
+
+    Счётчики живут в Redis и общие для всех воркеров. Разовые запросы
+    не вытесняют из кэша популярные.
+    """
+
+    def __init__(self, redis: Redis, min_hits: int, window: int):
+        self.redis = redis
+        self.min_hits = min_hits
+        self.window = window
+
+    @timed("cache")
+    async def admit(self, key: str) -> bool:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.incr(f"admission:{key}")
+            pipe.expire(f"admission:{key}", self.window)
+            hits, _ = await pipe.execute()
+        return hits >= self.min_hits
+
+
+class LocalCache:
+    """LRU-кэш в памяти процесса с ограниченным временем жизни записей.
+
+    Для самых частых и дешёвых ответов, где даже поход в Redis заметен в задержке.
+    """
+
+    def __init__(self, maxsize: int, expire: int):
+        self.maxsize = maxsize
+        self.expire = expire
+        self._data: OrderedDict[str, tuple[float, ResponseBody]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[ResponseBody]:
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            mark_cache(False)
+            self._data.pop(key, None)
+            return None
+        mark_cache(True)
+        self._data.move_to_end(key)
+        return item[1]
+
+    def set(self, key: str, body: ResponseBody) -> None:
+        self._data[key] = (time.monotonic() + self.expire, body)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
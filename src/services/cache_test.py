@@ -0,0 +1,83 @@
+import gzip
+import inspect
+import re
+import sys
+
+import orjson
+
+from src.benchmarks.env import setup_env
+
+setup_env()
+
+from src.services import compression  # noqa: E402
+from src.services.cache import ResponseBody  # noqa: E402
+
+LARGE_CONTENT = orjson.dumps([{"id": str(i), "title": f"film {i}"} for i in range(200)])
+
+
+def test_etag_depends_on_content():
+    assert ResponseBody(b"[1]").etag == ResponseBody(b"[1]").etag
+    assert ResponseBody(b"[1]").etag != ResponseBody(b"[2]").etag
+
+
+def test_etag_is_kept_from_headers():
+    assert ResponseBody(b"[1]", {"ETag": '"fixed"'}).etag == '"fixed"'
+
+
+def test_small_body_is_not_precompressed():
+    body = ResponseBody(b"[]")
+    body.precompress()
+
+    assert body.encoded == {}
+
+
+def test_precompress_builds_every_codec():
+    body = ResponseBody(LARGE_CONTENT)
+    body.precompress()
+
+    assert set(body.encoded) == set(compression.CODECS)
+    assert gzip.decompress(body.encoded["gzip"]) == LARGE_CONTENT
+
+
+def test_dumps_and_loads_with_variants():
+    body = ResponseBody(LARGE_CONTENT, {"X-Next-Cursor": "abc"})
+    body.precompress()
+
+    restored = ResponseBody.loads(body.dumps())
+
+    assert restored.content == LARGE_CONTENT
+    assert restored.headers == body.headers
+    assert restored.encoded == body.encoded
+
+
+def test_dumps_and_loads_without_variants():
+    body = ResponseBody(b'{"id":"1"}')
+
+    restored = ResponseBody.loads(body.dumps())
+
+    assert restored.content == b'{"id":"1"}'
+    assert restored.encoded == {}
+
+
+def test_content_with_newlines_survives_round_trip():
+    body = ResponseBody(b'[\n"a"\n]')
+
+    assert ResponseBody.loads(body.dumps()).content == b'[\n"a"\n]'
+
+
+def test_loads_old_format():
+    restored = ResponseBody.loads(orjson.dumps({"X-Next-Cursor": "abc"}) + b"\n[1]")
+
+    assert restored.content == b"[1]"
+    assert restored.headers["X-Next-Cursor"] == "abc"
+    assert restored.encoded == {}
+
+
+def run_tests(pattern="test_*"):
+    search_pattern = re.compile(pattern)
+    for name, func in inspect.getmembers(sys.modules[__name__]):
+        if search_pattern.match(name):
+            func()
+
+
+run_tests()
@@ -1,14 +1,97 @@
-from fastapi import Query
+from http import HTTPStatus
+
+from fastapi import HTTPException, Query
 from pydantic import BaseModel, UUID4
 
+from src.core.config import DEFAULT_PAGE_SIZE, ES_MAX_RESULT_WINDOW
+from src.services.pagination import Cursor
+
+CURSOR_DESCRIPTION = 'Токен следующей страницы из заголовка X-Next-Cursor. Если передан, page не учитывается'
+PIT_DESCRIPTION = 'Листать выдачу в рамках point-in-time, чтобы она не менялась при переиндексации'
+
+
+def check_result_window(from_: int, size: int) -> None:
+    if from_ + size > ES_MAX_RESULT_WINDOW:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"page is too deep, use cursor pagination beyond {ES_MAX_RESULT_WINDOW} results",
+        )
+
+
+def normalize_text(text: str) -> str:
+    """Приводит текст запроса к одному виду для ключей кэша: регистр и пробелы не важны."""
+    return " ".join(text.casefold().split())
+
+
+def parse_fields(fields: str | None, allowed: list[str]) -> list[str]:
+    """Разбирает список полей `a,b,c` из запроса; без параметра возвращает все допустимые поля."""
+    if not fields:
+        return allowed
+    requested = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"unknown fields: {', '.join(unknown)}; allowed: {', '.join(allowed)}",
+        )
+    return requested
+
+
+FIELDS_DESCRIPTION = 'Поля ответа через запятую, например id,title. Поле id возвращается всегда, неизвестное поле — ошибка 400'
+
+
+def fields_key(fields: list[str], default: list[str]) -> str:
+    """Суффикс ключа кэша для набора полей; у ответа со всеми полями по умолчанию суффикса нет."""
+    return "" if fields == default else f":fields={','.join(fields)}"
+
+
+def fields_variant(fields: list[str]) -> str:
+    """Имя поля хеша `{документ}:fields`, под которым в кэше лежит ответ с набором полей `fields`."""
+    return ",".join(fields)
+
+
+def parse_response_fields(fields: str | None, allowed: list[str], default: list[str]) -> list[str]:
+    """Поля ответа из параметра `fields=`: всегда с `id` и в порядке `allowed`,
+    чтобы одинаковые наборы полей давали одно тело и один ключ кэша."""
+    if not fields:
+        return default
+    requested = {*parse_fields(fields, allowed), "id"}
+    return [field for field in allowed if field in requested]
 
-class CommonQueryParamsMixin:
+
+class ExportQueryParams:
+    def __init__(
+            self,
+            fields: str = Query(None, description='Поля документов через запятую. По умолчанию — все'),
+            gzip: bool = Query(False, description='Сжать поток gzip'),
+    ):
+        self.fields: str | None = fields
+        self.gzip: bool = gzip
+
+
+class CursorParamsMixin:
+    cursor: Cursor | None
+    pit: bool
+
+    @property
+    def search_after(self) -> list | None:
+        return self.cursor.search_after if self.cursor else None
+
+    @property
+    def cacheable(self) -> bool:
+        """Страницы внутри point-in-time уникальны для клиента, кэшировать их нет смысла."""
+        return not self.pit and not (self.cursor and self.cursor.pit_id)
+
+
+class CommonQueryParamsMixin(CursorParamsMixin):
     def __init__(
             self,
             sort: str = Query(None, description='Сортировка данных по полям. Пример: field_name:(asc|desc),field_name:(asc|desc)'),
-            page: int = Query(default=1),
+            page: int = Query(default=1, ge=1),
             size: int = Query(default=20, ge=1, le=50),
-            filter_: str = Query(None, alias='filter', description='Текст фильтрации данных')
+            filter_: str = Query(None, alias='filter', description='Текст фильтрации данных'),
+            cursor: str = Query(None, description=CURSOR_DESCRIPTION),
+            pit: bool = Query(False, description=PIT_DESCRIPTION),
 
     ):
         self.sort: str = sort
@@ -16,22 +99,41 @@ class CommonQueryParamsMixin:
         self.size: int = size
         self.from_: int = size * (page-1)
         self.filter_: str = filter_
+        self.cursor: Cursor | None = Cursor.decode(cursor) if cursor else None
+        self.pit: bool = pit
+        if self.cursor is None:
+            check_result_window(self.from_, self.size)
+
+    def __str__(self):
+        """Нужна для корректного формированию ключа в кэше (Redis)."""
+        return f"sort={self.sort}&page={self.from_}&size={self.size}&filter={self.filter_}&after={self.search_after}"
 
 
-class CommonQueryParams:
+class CommonQueryParams(CursorParamsMixin):
     sorts = {
         "imdb_rating": {"imdb_rating": "asc"},
         "-imdb_rating": {"imdb_rating": "desc"},
     }
 
-    def __init__(self, page: int = 1, size: int = 20, sort: str | None = None):
+    def __init__(
+            self,
+            page: int = Query(default=1, ge=1),
+            size: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=50),
+            sort: str | None = None,
+            cursor: str | None = Query(None, description=CURSOR_DESCRIPTION),
+            pit: bool = Query(False, description=PIT_DESCRIPTION),
+    ):
         self.from_ = (page - 1) * size
         self.size = size
         self.sort = self.sorts.get(sort)
+        self.cursor = Cursor.decode(cursor) if cursor else None
+        self.pit = pit
+        if self.cursor is None:
+            check_result_window(self.from_, self.size)
 
     def __str__(self):
         """Нужна для корректного формированию ключа в кэше (Redis)."""
-        return f"sort={self.sort}&page={self.from_}&size={self.size}"
+        return f"sort={self.sort}&page={self.from_}&size={self.size}&after={self.search_after}"
 
 
 class Uuid(BaseModel):
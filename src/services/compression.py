@@ -0,0 +1,71 @@
+"""Сжатие тел ответов: выбор кодировки по `Accept-Encoding` и сами кодеки.
+
+gzip есть всегда; brotli и zstd используются, только если установлены
+пакеты `brotli` и `zstandard`.
+"""
+import gzip
+from typing import Callable, Optional
+
+from src.core.config import COMPRESSION_LEVELS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _zstd(content: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=COMPRESSION_LEVELS["zstd"]).compress(content)
+
+
+def _br(content: bytes) -> bytes:
+    return brotli.compress(content, quality=COMPRESSION_LEVELS["br"])
+
+
+def _gzip(content: bytes) -> bytes:
+    return gzip.compress(content, compresslevel=COMPRESSION_LEVELS["gzip"], mtime=0)
+
+
+# Доступные кодировки в порядке предпочтения сервера при равном q у клиента.
+CODECS: dict[str, Callable[[bytes], bytes]] = {
+    name: codec
+    for name, codec, available in (
+        ("zstd", _zstd, zstandard is not None),
+        ("br", _br, brotli is not None),
+        ("gzip", _gzip, True),
+    )
+    if available
+}
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    return CODECS[encoding](content)
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Лучшая из доступных кодировок по заголовку `Accept-Encoding` или None, если сжимать нельзя."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        weights[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for name in CODECS:
+        quality = weights.get(name, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
@@ -0,0 +1,69 @@
+import gzip
+import inspect
+import re
+import sys
+
+from src.benchmarks.env import setup_env
+
+setup_env()
+
+from src.services.compression import CODECS, compress, negotiate  # noqa: E402
+
+# Самая предпочтительная из установленных кодировок
+BEST = next(iter(CODECS))
+
+
+def test_no_header_means_identity():
+    assert negotiate(None) is None
+    assert negotiate("") is None
+
+
+def test_unknown_encoding_means_identity():
+    assert negotiate("deflate, identity") is None
+
+
+def test_gzip_only():
+    assert negotiate("gzip") == "gzip"
+
+
+def test_server_preference_on_equal_quality():
+    assert negotiate("gzip, br, zstd") == BEST
+
+
+def test_client_quality_wins():
+    assert negotiate("zstd;q=0.1, br;q=0.2, gzip;q=0.9") == "gzip"
+
+
+def test_zero_quality_excludes_encoding():
+    assert negotiate("gzip;q=0") is None
+
+
+def test_wildcard():
+    assert negotiate("*") == BEST
+    assert negotiate("*, gzip;q=0") == next((name for name in CODECS if name != "gzip"), None)
+
+
+def test_malformed_quality_is_skipped():
+    assert negotiate("gzip;q=abc") is None
+    assert negotiate("br;q=abc, gzip") == "gzip"
+
+
+def test_case_and_spaces_are_ignored():
+    assert negotiate("  GZIP ; q=0.5 ") == "gzip"
+
+
+def test_gzip_is_deterministic():
+    content = b"x" * 2000
+
+    assert compress(content, "gzip") == compress(content, "gzip")
+    assert gzip.decompress(compress(content, "gzip")) == content
+
+
+def run_tests(pattern="test_*"):
+    search_pattern = re.compile(pattern)
+    for name, func in inspect.getmembers(sys.modules[__name__]):
+        if search_pattern.match(name):
+            func()
+
+
+run_tests()
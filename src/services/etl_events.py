@@ -0,0 +1,92 @@
+"""Уведомления ETL о загруженных пачках документов.
+
+После каждой пачки ETL публикует в канал Redis `ETL_EVENTS_CHANNEL`
+сообщение `{"id": ..., "index": ..., "ids": [...]}`. Сервисы подписываются на нужный
+индекс декоратором `subscribe` и обновляют свои данные в памяти и кэше.
+Сообщение получает каждый воркер; общий для всех воркеров кэш Redis достаточно
+обновить одному, поэтому такие обработчики подписываются с `once=True`.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+import orjson
+from elasticsearch import AsyncElasticsearch
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.core.config import ETL_EVENT_CLAIM_SECONDS, ETL_EVENTS_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Redis, AsyncElasticsearch, list[str]], Awaitable[None]]
+
+handlers: dict[str, list[tuple[Handler, bool]]] = defaultdict(list)
+
+
+class Event(NamedTuple):
+    index: str
+    ids: list[str]
+    id: Optional[str] = None
+
+
+def subscribe(index: str, once: bool = False) -> Callable[[Handler], Handler]:
+    """С `once` обработчик выполняет только воркер, первым занявший событие."""
+
+    def decorator(handler: Handler) -> Handler:
+        handlers[index].append((handler, once))
+        return handler
+
+    return decorator
+
+
+async def claim(redis: Redis, event: Event, handler: Handler) -> bool:
+    """Занимает событие для обработчика так же, как прогрев занимает блокировку; без ID события — всегда успешно."""
+    if event.id is None:
+        return True
+    return bool(await redis.set(f"etl:claim:{event.id}:{handler.__name__}", 1, nx=True, ex=ETL_EVENT_CLAIM_SECONDS))
+
+
+async def dispatch(redis: Redis, elastic: AsyncElasticsearch, event: Event) -> None:
+    for handler, once in handlers[event.index]:
+        try:
+            if once and not await claim(redis, event, handler):
+                continue
+            await handler(redis, elastic, event.ids)
+        except Exception:
+            logger.exception("ETL event handler %s failed for index %s", handler.__name__, event.index)
+
+
+async def listen(redis: Redis, subscriber: Redis, elastic: AsyncElasticsearch) -> None:
+    """Слушает канал уведомлений ETL через отдельный клиент `subscriber`; при ошибке Redis переподписывается."""
+    while True:
+        pubsub = subscriber.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(ETL_EVENTS_CHANNEL)
+            async for message in pubsub.listen():
+                event = parse_event(message["data"])
+                if event is not None:
+                    await dispatch(redis, elastic, event)
+        except RedisError as error:
+            logger.warning("ETL events subscription lost (%r), reconnecting", error)
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.reset()
+
+
+def parse_event(data: bytes) -> Optional[Event]:
+    """Событие из сообщения ETL; некорректное сообщение пропускается, чтобы не останавливать подписку.
+
+    Сообщения без `id` от старых версий ETL обрабатываются каждым воркером.
+    """
+    try:
+        event = orjson.loads(data)
+        index, ids, event_id = event["index"], event["ids"], event.get("id")
+    except (orjson.JSONDecodeError, TypeError, KeyError, AttributeError):
+        logger.warning("Malformed ETL event skipped: %r", data)
+        return None
+    if not isinstance(index, str) or not isinstance(ids, list) or not isinstance(event_id, (str, type(None))):
+        logger.warning("Malformed ETL event skipped: %r", data)
+        return None
+    return Event(index, [str(id_) for id_ in ids], event_id)
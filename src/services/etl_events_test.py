@@ -0,0 +1,83 @@
+import asyncio
+import inspect
+import re
+import sys
+
+from src.benchmarks.env import setup_env
+
+setup_env()
+
+from src.benchmarks.fakes import FakeRedis  # noqa: E402
+from src.services import etl_events  # noqa: E402
+from src.services.cache import ResponseBody, ResponseCache  # noqa: E402
+from src.services.etl_events import Event, dispatch, parse_event  # noqa: E402
+from src.services.film import invalidate_films  # noqa: E402
+
+calls = []
+
+
+@etl_events.subscribe("test")
+async def every_worker(redis, elastic, ids):
+    calls.append("every_worker")
+
+
+@etl_events.subscribe("test", once=True)
+async def one_worker(redis, elastic, ids):
+    calls.append("one_worker")
+
+
+def dispatch_on_workers(event, workers):
+    """Одно сообщение получают `workers` воркеров с общим Redis."""
+    redis = FakeRedis()
+    calls.clear()
+
+    async def run():
+        for _ in range(workers):
+            await dispatch(redis, None, event)
+
+    asyncio.run(run())
+    return sorted(calls)
+
+
+def test_parse_event():
+    assert parse_event(b'{"id": "e1", "index": "movies", "ids": [1, "2"]}') == Event("movies", ["1", "2"], "e1")
+    assert parse_event(b'{"index": "movies", "ids": []}') == Event("movies", [], None)
+
+
+def test_malformed_event_is_skipped():
+    for data in (b"not json", b"[]", b'{"index": "movies"}', b'{"id": 1, "index": "movies", "ids": []}'):
+        assert parse_event(data) is None, data
+
+
+def test_once_handler_runs_on_one_worker():
+    assert dispatch_on_workers(Event("test", ["1"], "e1"), workers=3) == ["every_worker"] * 3 + ["one_worker"]
+
+
+def test_event_without_id_runs_on_every_worker():
+    assert dispatch_on_workers(Event("test", ["1"]), workers=2) == ["every_worker"] * 2 + ["one_worker"] * 2
+
+
+def test_invalidate_films_drops_every_field_set():
+    redis = FakeRedis()
+    cache = ResponseCache(redis)
+
+    async def run():
+        for film_id in ("1", "2"):
+            for variant in ("id,title", "id,title,imdb_rating"):
+                await cache.set_variant(f"film:{film_id}:fields", variant, ResponseBody(b"{}"), 60, 600)
+            await cache.set(f"film:{film_id}:similar", ResponseBody(b"[]"), 60)
+        await invalidate_films(redis, None, ["1"])
+
+    asyncio.run(run())
+
+    assert sorted(redis.data) == ["film:2:fields", "film:2:similar", "stale:film:2:fields"]
+
+
+def run_tests(pattern="test_*"):
+    search_pattern = re.compile(pattern)
+    for name, func in inspect.getmembers(sys.modules[__name__]):
+        if search_pattern.match(name):
+            func()
+
+
+run_tests()
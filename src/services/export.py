@@ -0,0 +1,57 @@
+"""Потоковая выгрузка всего индекса в NDJSON.
+
+Индекс обходится пачками через point-in-time и `search_after`, каждая пачка
+сериализуется и отдаётся клиенту до чтения следующей. StreamingResponse ждёт
+отправки каждого куска, поэтому медленный клиент притормаживает чтение из ES,
+а в памяти одновременно находится не больше одной пачки.
+"""
+import zlib
+from typing import AsyncIterator
+
+import orjson
+from elasticsearch import AsyncElasticsearch
+
+from src.core.config import EXPORT_BATCH_SIZE, PIT_KEEP_ALIVE
+from src.services import serializers
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def iter_hits(elastic: AsyncElasticsearch, index: str, source_includes: list[str]) -> AsyncIterator[list]:
+    """Пачки документов индекса в порядке `_shard_doc` — самом дешёвом для полного обхода."""
+    pit_id = (await elastic.open_point_in_time(index=index, keep_alive=PIT_KEEP_ALIVE))["id"]
+    search_after = None
+    try:
+        while True:
+            response = await elastic.search(
+                pit={"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+                sort=[{"_shard_doc": "asc"}],
+                size=EXPORT_BATCH_SIZE,
+                search_after=search_after,
+                source_includes=source_includes,
+                filter_path=serializers.HITS_FILTER_PATH,
+            )
+            hits = serializers.hits(response)
+            if not hits:
+                return
+            yield hits
+            search_after = hits[-1]["sort"]
+            pit_id = response.get("pit_id", pit_id)
+    finally:
+        await elastic.close_point_in_time(id=pit_id)
+
+
+async def ndjson_stream(
+    elastic: AsyncElasticsearch, index: str, source_includes: list[str], gzip: bool = False
+) -> AsyncIterator[bytes]:
+    """Куски NDJSON, по одному на пачку документов; при `gzip` — сжатые одним непрерывным потоком."""
+    compressor = zlib.compressobj(wbits=31) if gzip else None
+    async for hits in iter_hits(elastic, index, source_includes):
+        chunk = b"".join(orjson.dumps(hit["_source"], option=orjson.OPT_APPEND_NEWLINE) for hit in hits)
+        if compressor:
+            chunk = compressor.compress(chunk)
+            if not chunk:
+                continue
+        yield chunk
+    if compressor:
+        yield compressor.flush()
@@ -1,116 +1,261 @@
-from functools import lru_cache
-from typing import Optional
+import asyncio
+from functools import lru_cache, partial
+from typing import AsyncIterator, Optional
 
-import orjson
 from elasticsearch import AsyncElasticsearch, BadRequestError, NotFoundError
 from fastapi import Depends
-from fastapi_redis_cache import cache
 from pydantic import UUID4
 from redis.asyncio import Redis
-from starlette.responses import Response
 
-from src.core.config import FILM_CACHE_EXPIRE_IN_SECONDS
+from src.core.config import (
+    FACETS_CACHE_EXPIRE_IN_SECONDS,
+    FILM_CACHE_EXPIRE_IN_SECONDS,
+    SEARCH_CACHE_ADMISSION_WINDOW,
+    SEARCH_CACHE_EXPIRE_IN_SECONDS,
+    SEARCH_CACHE_MIN_HITS,
+    SIMILAR_CACHE_EXPIRE_IN_SECONDS,
+    SIMILAR_FILMS_SIZE,
+    STALE_CACHE_EXPIRE_IN_SECONDS,
+)
 from src.db.elastic import get_elastic
 from src.db.redis import get_redis
-from src.models.film import Film, Genre, Person
-from src.services.common import CommonQueryParams
-from src.services.filmdependencies import FilmQuery, GenreFilter, MatchQuery
+from src.services import etl_events, serializers
+from src.services.batch import get_details_by_ids
+from src.services.budget import acquire_or_reject, rate_limited, within_budget
+from src.services.cache import CacheAdmission, ResponseBody, ResponseCache
+from src.services.common import (
+    CommonQueryParams,
+    ExportQueryParams,
+    fields_key,
+    fields_variant,
+    parse_fields,
+    parse_response_fields,
+)
+from src.services.export import ndjson_stream
+from src.services.filmdependencies import FACETS_AGGS, FilmFilter, FilmQuery, MatchQuery, similar_query
+from src.services.pagination import search_page
+from src.services.ratelimit import RequestLimiter
+from src.services.suggest import suggest
 
 
 class FilmService:
-    """Сервис для получения данных о фильмах."""
+    """Сервис для получения данных о фильмах.
+
+    Возвращает готовые JSON-тела ответов: документ ES сериализуется один раз,
+    а в кэше хранится уже итоговый ответ.
+    """
 
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis = redis
         self.elastic = elastic
+        self.cache = ResponseCache(redis)
+        self.search_admission = CacheAdmission(
+            redis, min_hits=SEARCH_CACHE_MIN_HITS, window=SEARCH_CACHE_ADMISSION_WINDOW
+        )
+        self.limiter = RequestLimiter(redis)
+
+    async def get_by_id(self, film_id: UUID4, fields: str | None = None) -> Optional[ResponseBody]:
+        """Возвращает тело ответа с данными фильма. Оно опционально, так как фильм может отсутствовать в базе.
+
+        `fields` ограничивает поля ответа: из ES читаются и сериализуются только они.
+        """
+        fields_ = parse_response_fields(fields, serializers.FILM_DETAILS_FIELDS, serializers.FILM_DETAILS_FIELDS)
+        key, variant = f"film:{film_id}:fields", fields_variant(fields_)
+        body = await self.cache.get_variant(key, variant)
+        if body is None:
+            body = await within_budget(
+                "film",
+                self.limiter,
+                self._fetch_film(key, variant, str(film_id), fields_),
+                lambda: self.cache.get_stale_variant(key, variant),
+            )
+        return body
 
-    async def get_by_id(self, film_id: UUID4) -> Optional[Film]:
-        """Возвращает объект фильма. Он опционален, так как фильм может отсутствовать в базе"""
-        result = await self._get_film_from_elastic(str(film_id))
-        film = orjson.loads(result.body)
-        return self._json_to_film(film)
+    async def _fetch_film(self, key: str, variant: str, film_id: str, fields: list[str]) -> Optional[ResponseBody]:
+        body = await self._get_film_from_elastic(film_id, fields)
+        if body is not None:
+            await self.cache.set_variant(
+                key, variant, body, FILM_CACHE_EXPIRE_IN_SECONDS, STALE_CACHE_EXPIRE_IN_SECONDS
+            )
+        return body
 
-    @cache(expire=FILM_CACHE_EXPIRE_IN_SECONDS)
-    async def _get_film_from_elastic(self, film_id: str) -> Optional[Film]:
+    async def _get_film_from_elastic(self, film_id: str, fields: list[str]) -> Optional[ResponseBody]:
         """Получает данные о фильме из ES по film_id."""
         try:
-            doc = await self.elastic.get(index="movies", id=film_id)
+            doc = await self.elastic.get(index="movies", id=film_id, source_includes=fields)
+        except NotFoundError:
+            return None
+        return ResponseBody(serializers.film_details(doc["_source"], fields))
+
+    async def get_similar(self, film_id: UUID4) -> Optional[ResponseBody]:
+        """Возвращает тело ответа с фильмами, похожими на данный; None, если такого фильма нет."""
+        key = f"film:{film_id}:similar"
+        body = await self.cache.get(key)
+        if body is None:
+            body = await rate_limited("film_similar", self.limiter, self._fetch_similar(key, str(film_id)))
+        return body
+
+    async def _fetch_similar(self, key: str, film_id: str) -> Optional[ResponseBody]:
+        try:
+            doc = await self.elastic.get(index="movies", id=film_id, source_includes=serializers.FILM_SIMILAR_FIELDS)
         except NotFoundError:
             return None
-        return doc["_source"]
+        response = await self.elastic.search(
+            index="movies",
+            query=similar_query(film_id, doc["_source"]),
+            size=SIMILAR_FILMS_SIZE,
+            source_includes=serializers.FILM_LIST_FIELDS,
+            filter_path=["hits.hits._source"],
+        )
+        body = ResponseBody(serializers.films_list(serializers.hits(response)))
+        await self.cache.set(key, body, SIMILAR_CACHE_EXPIRE_IN_SECONDS)
+        return body
+
+    async def get_by_ids(
+        self, film_ids: list[UUID4], refresh: bool = False, fields: str | None = None
+    ) -> ResponseBody:
+        """Возвращает тело ответа со списком фильмов по их ID. Промахи кэша ограничены лимитом, кроме прогрева."""
+        fields_ = parse_response_fields(fields, serializers.FILM_DETAILS_FIELDS, serializers.FILM_DETAILS_FIELDS)
+        return await get_details_by_ids(
+            self.cache,
+            self.elastic,
+            index="movies",
+            key_prefix="film",
+            ids=[str(film_id) for film_id in film_ids],
+            source_includes=fields_,
+            serialize=partial(serializers.film_details, fields=fields_),
+            expire=FILM_CACHE_EXPIRE_IN_SECONDS,
+            variant=fields_variant(fields_),
+            refresh=refresh,
+            before_fetch=None if refresh else partial(acquire_or_reject, "films_batch", self.limiter),
+        )
 
     async def get_films(
         self,
         commons: CommonQueryParams,
-        filter_: GenreFilter | None = None,
+        filter_: FilmFilter | None = None,
         match_query: MatchQuery | None = None,
-        cache_: bool = False
-    ) -> Optional[list[Film]]:
-        """Возвращает список фильмов, полученных из данных JSON"""
+        cache_: bool = False,
+        facets: bool = False,
+        refresh: bool = False,
+        fields: str | None = None,
+    ) -> Optional[ResponseBody]:
+        """Возвращает тело ответа со списком фильмов и курсором следующей страницы в заголовках.
+
+        Результаты полнотекстового поиска живут в кэше меньше и попадают туда только для повторяющихся запросов.
+        С `facets` ответ содержит `items` и `facets`. Фасеты всего каталога кэшируются отдельно от страниц,
+        для отфильтрованной выдачи они считаются тем же запросом к ES, что и страница.
+        С `refresh` страница берётся из ES и перезаписывается в кэше — так её прогревает `warmup`.
+        `fields` выбирает поля элементов списка из полей детального ответа.
+        """
+        fields_ = parse_response_fields(fields, serializers.FILM_DETAILS_FIELDS, serializers.FILM_LIST_FIELDS)
         query = FilmQuery(filter_=filter_, match_query=match_query)
-        try:
-            if cache_:
-                results = await self._get_films_with_cache(commons=commons, query=query)
-                results = orjson.loads(results.body)
-            else:
-                results = await self._get_films_without_cache(commons=commons, query=query)
+        if facets and query.is_unfiltered:
+            items, all_facets = await asyncio.gather(
+                self.get_films(commons=commons, cache_=cache_, fields=fields), self._get_catalog_facets()
+            )
+            if items is None:
+                return None
+            headers = {name: value for name, value in items.headers.items() if name != "ETag"}
+            return ResponseBody(serializers.with_facets(items.content, all_facets), headers)
 
-            result = [self._json_to_film(film["_source"]) for film in results]
+        key = f"films:{commons}&{query}&facets={facets}{fields_key(fields_, serializers.FILM_LIST_FIELDS)}"
+        cache_ = cache_ and commons.cacheable
+        fetch = self._fetch_films(key, commons, query, fields_, facets, cache_)
+        if refresh:
+            return await fetch
+        route = "films" if match_query is None else "films_search"
+        if not cache_:
+            # Страницы point-in-time не кэшируются и не имеют старых версий, но ES нагружают так же
+            return await rate_limited(route, self.limiter, fetch)
+        body = await self.cache.get(key)
+        if body is not None:
+            fetch.close()
+            return body
+        return await within_budget(route, self.limiter, fetch, lambda: self.cache.get_stale(key))
+
+    async def _fetch_films(
+        self, key: str, commons: CommonQueryParams, query: FilmQuery, fields: list[str], facets: bool, cache_: bool
+    ) -> Optional[ResponseBody]:
+        try:
+            body = await self._get_films_from_elastic(commons=commons, query=query, fields=fields, facets=facets)
         except BadRequestError:
             return None
+        if body is None or not cache_:
+            return body
+        if query.match_query is None:
+            await self.cache.set(key, body, FILM_CACHE_EXPIRE_IN_SECONDS, STALE_CACHE_EXPIRE_IN_SECONDS)
+        elif await self.search_admission.admit(key):
+            await self.cache.set(key, body, SEARCH_CACHE_EXPIRE_IN_SECONDS, STALE_CACHE_EXPIRE_IN_SECONDS)
+        return body
 
-        return result
-
-    @cache(expire=FILM_CACHE_EXPIRE_IN_SECONDS)
-    async def _get_films_with_cache(self, commons: CommonQueryParams, query: FilmQuery) -> Optional[Response]:
-        films = await self.elastic.search(
+    async def _get_films_from_elastic(
+        self, commons: CommonQueryParams, query: FilmQuery, fields: list[str], facets: bool = False
+    ) -> Optional[ResponseBody]:
+        page = await search_page(
+            self.elastic,
             index="movies",
+            query=query.query,
+            sort=[commons.sort or {"_score": "desc"}],
             from_=commons.from_,
-            sort=commons.sort,
             size=commons.size,
-            query=query.query,
+            cursor=commons.cursor,
+            pit=commons.pit,
+            source_includes=fields,
+            aggs=FACETS_AGGS if facets else None,
         )
+        if not page.hits:
+            return None
+        content = serializers.films_list(page.hits, fields)
+        if facets:
+            content = serializers.with_facets(content, serializers.facets(page.aggregations))
+        return ResponseBody(content, page.headers)
 
-        return films.body["hits"]["hits"]
+    async def _get_catalog_facets(self) -> bytes:
+        """Фасеты по всем фильмам: не зависят от страницы, поэтому кэшируются одной записью."""
+        key = "films:facets"
+        body = await self.cache.get(key)
+        if body is None:
+            response = await self.elastic.search(
+                index="movies", size=0, aggs=FACETS_AGGS, filter_path=["aggregations"]
+            )
+            body = ResponseBody(serializers.facets(response["aggregations"]))
+            await self.cache.set(key, body, FACETS_CACHE_EXPIRE_IN_SECONDS)
+        return body.content
 
-    async def _get_films_without_cache(
-        self,
-        commons: CommonQueryParams,
-        query: FilmQuery,
-    ) -> Optional[Response]:
-
-        films = await self.elastic.search(
+    async def suggest(self, prefix: str, size: int) -> ResponseBody:
+        """Возвращает тело ответа с подсказками названий фильмов по началу ввода."""
+        return await suggest(
+            self.elastic,
             index="movies",
-            from_=commons.from_,
-            sort=commons.sort,
-            size=commons.size,
-            query=query.query,
+            field="title.suggest",
+            prefix=prefix,
+            size=size,
+            source_includes=serializers.FILM_SUGGEST_FIELDS,
         )
 
-        return films.body["hits"]["hits"]
-
-    @staticmethod
-    def _json_to_film(films_json):
-        actors = [Person(**f) for f in films_json["actors"]]
-        directors = [Person(**f) for f in films_json["directors"]]
-        writers = [Person(**f) for f in films_json["writers"]]
-        genre = [Genre(**f) for f in films_json["genre"]]
-        film = Film(
-            id=films_json["id"],
-            imdb_rating=films_json["imdb_rating"],
-            description=films_json["description"],
-            title=films_json["title"],
-            actors=actors,
-            directors=directors,
-            writers=writers,
-            genre=genre,
-        )
-        return film
+    def export(self, params: ExportQueryParams) -> AsyncIterator[bytes]:
+        """Поток NDJSON со всеми фильмами индекса `movies`."""
+        fields = parse_fields(params.fields, serializers.FILM_EXPORT_FIELDS)
+        return ndjson_stream(self.elastic, "movies", fields, params.gzip)
 
     def __str__(self):
         return "FilmService"
 
 
+@etl_events.subscribe("movies", once=True)
+async def invalidate_films(redis: Redis, elastic: AsyncElasticsearch, ids: list[str]) -> None:
+    """Переиндексированные фильмы удаляются из кэша со всеми наборами полей, их устаревшими копиями
+    `stale:` и подборками похожих — три ключа на фильм."""
+    keys = [
+        key
+        for film_id in ids
+        for key in (f"film:{film_id}:fields", f"stale:film:{film_id}:fields", f"film:{film_id}:similar")
+    ]
+    if keys:
+        await redis.delete(*keys)
+
+
 @lru_cache()
 def get_film_service(
     redis: Redis = Depends(get_redis),
@@ -1,51 +1,155 @@
-from pydantic import UUID4, BaseModel
+from fastapi import Query
+from pydantic import UUID4, BaseModel, validator
 
+from src.services.common import normalize_text
 
-class GenreFilter(BaseModel):
 
-    genre: UUID4 | None = None
+class FilmFilter:
+    """Фильтры выдачи фильмов. Разные фильтры объединяются через И, значения внутри одного — через ИЛИ."""
+
+    def __init__(
+        self,
+        genre: list[UUID4] | None = Query(None, description="ID жанров"),
+        person: list[UUID4] | None = Query(None, description="ID персон: актёров, сценаристов или режиссёров"),
+        rating_from: float | None = Query(None, ge=0, le=10, description="Минимальный рейтинг IMDB"),
+        rating_to: float | None = Query(None, ge=0, le=10, description="Максимальный рейтинг IMDB"),
+    ):
+        self.genre = sorted(map(str, set(genre or [])))
+        self.person = sorted(map(str, set(person or [])))
+        self.rating_from = rating_from
+        self.rating_to = rating_to
+
+    @property
+    def clauses(self) -> list[dict]:
+        """Условия в контексте фильтра: не влияют на релевантность, и ES кэширует их битовые маски."""
+        clauses = []
+        if self.genre:
+            clauses.append({"nested": {"path": "genre", "query": {"terms": {"genre.id": self.genre}}}})
+        if self.person:
+            clauses.append(
+                {
+                    "bool": {
+                        "should": [
+                            {"nested": {"path": role, "query": {"terms": {f"{role}.id": self.person}}}}
+                            for role in ("actors", "writers", "directors")
+                        ],
+                        "minimum_should_match": 1,
+                    }
+                }
+            )
+        if self.rating_from is not None or self.rating_to is not None:
+            rating = {}
+            if self.rating_from is not None:
+                rating["gte"] = self.rating_from
+            if self.rating_to is not None:
+                rating["lte"] = self.rating_to
+            clauses.append({"range": {"imdb_rating": rating}})
+        return clauses
 
     def __str__(self):
         """Нужна для корректного формированию ключа в кэше (Redis)."""
-        return f"genre={self.genre}"
+        return (
+            f"genre={','.join(self.genre)}&person={','.join(self.person)}"
+            f"&rating={self.rating_from}-{self.rating_to}"
+        )
 
 
 class MatchQuery(BaseModel):
     query: str
 
+    @validator("query")
+    def normalize_query(cls, query):
+        """Одинаковые с точностью до регистра и пробелов запросы дают один ключ кэша."""
+        return normalize_text(query)
+
     def __str__(self):
         """Нужна для корректного формированию ключа в кэше (Redis)."""
         return f"query={self.query}"
 
 
+# Агрегации для фасетов: число фильмов по жанрам и гистограмма рейтинга.
+FACETS_AGGS = {
+    "genre": {
+        "nested": {"path": "genre"},
+        "aggs": {
+            "ids": {
+                "terms": {"field": "genre.id", "size": 100},
+                "aggs": {"name": {"top_hits": {"size": 1}}},
+            }
+        },
+    },
+    "imdb_rating": {
+        "histogram": {
+            "field": "imdb_rating",
+            "interval": 1,
+            "min_doc_count": 0,
+            "extended_bounds": {"min": 0, "max": 10},
+        }
+    },
+}
+
+
 class FilmQuery:
-    def __init__(self, filter_: GenreFilter | None, match_query: MatchQuery | None):
+    """Один `bool`-запрос из текстового поиска (влияет на релевантность) и фильтров (не влияют)."""
+
+    def __init__(self, filter_: FilmFilter | None, match_query: MatchQuery | None):
 
         self.filter_ = filter_
         self.match_query = match_query
 
-        if hasattr(self.filter_, "genre") and self.filter_.genre:
-            self.query = {
-                "bool": {
-                    "filter": {
-                        "nested": {
-                            "path": "genre",
-                            "query": {"term": {"genre.id": str(self.filter_.genre)}},
-                        }
+        must = []
+        if self.match_query and self.match_query.query:
+            must.append(
+                {
+                    "multi_match": {
+                        "query": self.match_query.query,
+                        "fields": ["title^3", "description"],
+                        "fuzziness": "AUTO",
                     }
                 }
-            }
-        elif hasattr(self.match_query, "query") and self.match_query.query:
-            self.query = {
-                "multi_match": {
-                    "query": self.match_query.query,
-                    "fields": ["title^3", "description"],
-                    "fuzziness": "AUTO",
-                }
-            }
+            )
+        filters = self.filter_.clauses if self.filter_ else []
+
+        if must or filters:
+            self.query = {"bool": {"must": must, "filter": filters}}
         else:
             self.query = {"match_all": {}}
 
+    @property
+    def is_unfiltered(self) -> bool:
+        return self.query == {"match_all": {}}
+
     def __str__(self):
         """Нужна для корректного формированию ключа в кэше (Redis)."""
         return f"filter_={self.filter_}&match_query={self.match_query}"
+
+
+# Вес совпадения по жанру и по участию каждой роли при поиске похожих фильмов
+SIMILAR_WEIGHTS = {"genre": 3.0, "directors": 2.0, "writers": 1.5, "actors": 1.0}
+
+
+def similar_query(film_id: str, source: dict) -> dict:
+    """Фильмы с теми же жанрами и персонами (каждое совпадение добавляет вес по `SIMILAR_WEIGHTS`)
+    и близким по тексту названием и описанием (`more_like_this`); сам фильм исключается."""
+    should = [
+        {
+            "nested": {
+                "path": field,
+                "query": {"terms": {f"{field}.id": ids, "boost": weight}},
+                "score_mode": "sum",
+            }
+        }
+        for field, weight in SIMILAR_WEIGHTS.items()
+        if (ids := [item["id"] for item in source.get(field) or []])
+    ]
+    should.append(
+        {
+            "more_like_this": {
+                "fields": ["title", "description"],
+                "like": [{"_index": "movies", "_id": film_id}],
+                "min_term_freq": 1,
+                "min_doc_freq": 2,
+            }
+        }
+    )
+    return {"bool": {"should": should, "minimum_should_match": 1, "must_not": [{"ids": {"values": [film_id]}}]}}
@@ -0,0 +1,67 @@
+"""Страница фильма одним запросом: фильм, его жанры и персонажи.
+
+Фильм читается из кэша или ES, после чего жанры берутся из справочника
+в памяти, а персонажи — одним конвейером HGET из кэша и одним `mget` в ES для промахов.
+Вместо каскада запросов к `/films`, `/genres` и `/persons` страница
+собирается примерно за два обращения к хранилищам.
+"""
+import asyncio
+from functools import lru_cache
+from typing import Optional
+
+import orjson
+from elasticsearch import AsyncElasticsearch
+from fastapi import Depends
+from pydantic import UUID4
+
+from src.db.elastic import get_elastic
+from src.services import serializers
+from src.services.cache import ResponseBody
+from src.services.film import FilmService, get_film_service
+from src.services.genre import catalog as genre_catalog
+from src.services.person import PersonService, get_person_service
+
+FILM_PERSON_ROLES = ("actors", "writers", "directors")
+
+
+class FilmPageService:
+    """Собирает страницу фильма из уже закэшированных тел ответов, не сериализуя их заново."""
+
+    def __init__(self, film_service: FilmService, person_service: PersonService, elastic: AsyncElasticsearch):
+        self.film_service = film_service
+        self.person_service = person_service
+        self.elastic = elastic
+
+    async def get_page(self, film_id: UUID4) -> Optional[ResponseBody]:
+        """Возвращает тело ответа страницы фильма или None, если фильма нет."""
+        film = await self.film_service.get_by_id(film_id)
+        if film is None:
+            return None
+
+        source = orjson.loads(film.content)
+        genre_ids = list(dict.fromkeys(genre["id"] for genre in source["genre"]))
+        person_ids = list(dict.fromkeys(person["id"] for role in FILM_PERSON_ROLES for person in source[role]))
+        _, persons = await asyncio.gather(genre_catalog.ensure_loaded(self.elastic), self._get_persons(person_ids))
+
+        genres = [genre_catalog.get(genre_id) for genre_id in genre_ids]
+        content = serializers.film_page(
+            film.content, [genre.content for genre in genres if genre is not None], persons
+        )
+        return ResponseBody(content)
+
+    async def _get_persons(self, person_ids: list[str]) -> bytes:
+        if not person_ids:
+            return b"[]"
+        return (await self.person_service.get_by_ids(person_ids)).content
+
+    def __str__(self):
+        return "FilmPageService"
+
+
+@lru_cache()
+def get_film_page_service(
+    film_service: FilmService = Depends(get_film_service),
+    person_service: PersonService = Depends(get_person_service),
+    elastic: AsyncElasticsearch = Depends(get_elastic),
+) -> FilmPageService:
+    return FilmPageService(film_service, person_service, elastic)
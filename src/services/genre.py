@@ -1,70 +1,204 @@
+import asyncio
+import logging
+from http import HTTPStatus
 from functools import lru_cache
-from typing import Optional, List
+from typing import AsyncIterator, Optional
 
-from elasticsearch import AsyncElasticsearch, NotFoundError
-from fastapi import Depends
-from fastapi_redis_cache import cache
+from elasticsearch import AsyncElasticsearch
+from fastapi import Depends, HTTPException
 from redis.asyncio import Redis
-import orjson
 
-from src.core.config import GENRE_CACHE_EXPIRE_IN_SECONDS
+from src.core.config import GENRE_CATALOG_REFRESH_SECONDS
+from src.core.metrics import mark_cache
 from src.db.elastic import get_elastic
 from src.db.redis import get_redis
-from src.models.genre import Genre
-from src.services.common import CommonQueryParamsMixin
+from src.services import etl_events, serializers
+from src.services.cache import ResponseBody
+from src.services.common import (
+    CommonQueryParamsMixin,
+    ExportQueryParams,
+    normalize_text,
+    parse_fields,
+    parse_response_fields,
+)
+from src.services.export import iter_hits, ndjson_stream
+from src.services.pagination import Cursor
 
+logger = logging.getLogger(__name__)
 
-class GenreService:
-    """Сервис для получения данных о жанрах."""
+# Поля, по которым список жанров хранится заранее отсортированным.
+SORT_FIELDS = ("name", "id")
 
-    def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
-        self.redis = redis
-        self.elastic = elastic
 
-    async def get_genre_by_id(self, genre_id: str) -> Optional[Genre]:
-        """Получааем данные о жанре по ID."""
-        result = await self._get_genre_by_id_from_elastic(genre_id)
-        genre = orjson.loads(result.body)
-        return Genre(**genre)
+def cursor_offset(search_after) -> int:
+    """Смещение из курсора списка жанров; курсор с чем-то кроме неотрицательного числа — 400."""
+    if not isinstance(search_after, list) or not search_after:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="invalid cursor")
+    offset = search_after[0]
+    if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="invalid cursor")
+    return offset
 
-    @cache(expire=GENRE_CACHE_EXPIRE_IN_SECONDS)
-    async def _get_genre_by_id_from_elastic(self, genre_id: str) -> Optional[Genre]:
-        """Получаем данные о жанре по ID из кэша Redis'а, если в кэше нет данных, то получаем данные из ES."""
-        try:
-            doc = await self.elastic.get(index="genres", id=genre_id)
-        except NotFoundError:
+
+class GenreCatalog:
+    """Справочник жанров целиком в памяти процесса.
+
+    Жанров несколько десятков, поэтому индекс загружается полностью: тела
+    ответов и их ETag готовятся заранее, списки хранятся уже отсортированными по
+    каждому полю, и ручки жанров отвечают без сетевых вызовов. Данные
+    перечитываются фоновой задачей и по уведомлению ETL. Тела с выбранным
+    клиентом набором полей сериализуются при первом запросе и запоминаются
+    до следующей загрузки.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._lock = asyncio.Lock()
+        self._details: dict[str, ResponseBody] = {}
+        self._sorted: dict[str, list[dict]] = {}
+        self._sources: dict[str, dict] = {}
+        self._projections: dict[tuple[str, ...], ResponseBody] = {}
+        self._item_projections: dict[tuple[str, ...], bytes] = {}
+
+    async def load(self, elastic: AsyncElasticsearch) -> None:
+        genres = []
+        async for hits in iter_hits(elastic, "genres", serializers.GENRE_DETAILS_FIELDS):
+            genres.extend(hit["_source"] for hit in hits)
+
+        items = [
+            {
+                "id": genre["id"],
+                "name": genre["genre_name"],
+                "tokens": set(normalize_text(genre["genre_name"]).split()),
+                "body": serializers.genre_list_item(genre),
+            }
+            for genre in genres
+        ]
+        self._sorted = {
+            field: sorted(items, key=lambda item: (item[field], item["id"])) for field in SORT_FIELDS
+        }
+        self._details = {genre["id"]: ResponseBody(serializers.genre_details(genre)) for genre in genres}
+        self._sources = {genre["id"]: genre for genre in genres}
+        self._projections, self._item_projections = {}, {}
+        self.loaded = True
+        logger.info("Genre catalog loaded: %s genres", len(genres))
+
+    async def ensure_loaded(self, elastic: AsyncElasticsearch) -> None:
+        """Загружает справочник при первом обращении, если при старте ES был недоступен."""
+        if self.loaded:
+            return
+        async with self._lock:
+            if not self.loaded:
+                await self.load(elastic)
+
+    async def refresh_periodically(self, elastic: AsyncElasticsearch) -> None:
+        while True:
+            await asyncio.sleep(GENRE_CATALOG_REFRESH_SECONDS)
+            try:
+                await self.load(elastic)
+            except Exception:
+                logger.exception("Genre catalog refresh failed")
+
+    @property
+    def ids(self) -> list[str]:
+        return [item["id"] for item in self._sorted.get("id", [])]
+
+    def get(self, genre_id: str, fields: list[str] = serializers.GENRE_RESPONSE_FIELDS) -> Optional[ResponseBody]:
+        mark_cache(True)
+        if fields == serializers.GENRE_RESPONSE_FIELDS:
+            return self._details.get(genre_id)
+        source = self._sources.get(genre_id)
+        if source is None:
+            return None
+        key = (genre_id, *fields)
+        if key not in self._projections:
+            self._projections[key] = ResponseBody(serializers.genre_details(source, fields))
+        return self._projections[key]
+
+    def _item_body(self, item: dict, fields: list[str]) -> bytes:
+        if fields == serializers.GENRE_LIST_RESPONSE_FIELDS:
+            return item["body"]
+        key = (item["id"], *fields)
+        if key not in self._item_projections:
+            self._item_projections[key] = serializers.genre_list_item(self._sources[item["id"]], fields)
+        return self._item_projections[key]
+
+    def page(
+        self, commons: CommonQueryParamsMixin, fields: list[str] = serializers.GENRE_LIST_RESPONSE_FIELDS
+    ) -> Optional[ResponseBody]:
+        """Страница списка жанров: фильтр по словам названия, сортировка и срез заранее отсортированного массива.
+
+        Курсор здесь — смещение в отсортированном массиве.
+        """
+        mark_cache(True)
+        items = self._sort(commons.sort)
+        if items is None:
             return None
-        return doc["_source"]
+        if commons.filter_:
+            tokens = set(normalize_text(commons.filter_).split())
+            items = [item for item in items if item["tokens"] & tokens]
 
-    async def get_genres(self, commons: CommonQueryParamsMixin) -> Optional[List[Genre]]:
-        """Возвращает список жанров."""
+        start = cursor_offset(commons.search_after) if commons.search_after is not None else commons.from_
+        end = start + commons.size
+        page = items[start:end]
+        if not page:
+            return None
+        headers = {}
+        if end < len(items):
+            headers = {"X-Next-Cursor": Cursor(search_after=[end]).encode()}
+        return ResponseBody(b"[" + b",".join(self._item_body(item, fields) for item in page) + b"]", headers)
+
+    def _sort(self, sort: Optional[str]) -> Optional[list[dict]]:
+        """Массив в нужном порядке; для сортировки по нескольким полям досортировывается стабильной сортировкой."""
+        if not sort:
+            return self._sorted["id"]
         try:
-            results = await self._get_genres_from_elastic(commons)
-            genres = orjson.loads(results.body)
-            result = [Genre(**genre["_source"]) for genre in genres]
-        except:
+            keys = [tuple(item.split(":")) for item in sort.split(",")]
+            items = self._sorted[keys[-1][0]]
+            if keys[-1][1] == "desc":
+                items = items[::-1]
+            for field, order in reversed(keys[:-1]):
+                items = sorted(items, key=lambda item: item[field], reverse=order == "desc")
+        except (KeyError, ValueError, IndexError):
             return None
-        return result
+        return items
 
-    @cache(expire=GENRE_CACHE_EXPIRE_IN_SECONDS)
-    async def _get_genres_from_elastic(self, commons: CommonQueryParamsMixin) -> Optional[Genre]:
-        sort = {}
-        query = {"match_all": {}}
-        if commons.sort:
-            sort = dict([(k, v) if k != "name" else ("genre_name.raw", v) for k,v in tuple(tuple(v.split(':')) for v in commons.sort.split(','))])
 
-        if commons.filter_:
-            query = {"match": {"name": commons.filter_}}
-
-        genres = await self.elastic.search(
-            index="genres",
-            from_=commons.from_,
-            sort=sort,
-            size=commons.size,
-            query=query,
+catalog = GenreCatalog()
+
+
+@etl_events.subscribe("genres")
+async def reload_catalog(redis: Redis, elastic: AsyncElasticsearch, ids: list[str]) -> None:
+    await catalog.load(elastic)
+
+
+class GenreService:
+    """Сервис для получения данных о жанрах."""
+
+    def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
+        self.redis = redis
+        self.elastic = elastic
+
+    async def get_genre_by_id(self, genre_id: str, fields: str | None = None) -> Optional[ResponseBody]:
+        """Возвращает тело ответа с данными жанра по ID из справочника в памяти."""
+        fields_ = parse_response_fields(
+            fields, serializers.GENRE_RESPONSE_FIELDS, serializers.GENRE_RESPONSE_FIELDS
+        )
+        await catalog.ensure_loaded(self.elastic)
+        return catalog.get(str(genre_id), fields_)
+
+    async def get_genres(self, commons: CommonQueryParamsMixin, fields: str | None = None) -> Optional[ResponseBody]:
+        """Возвращает тело ответа со списком жанров из справочника в памяти."""
+        fields_ = parse_response_fields(
+            fields, serializers.GENRE_RESPONSE_FIELDS, serializers.GENRE_LIST_RESPONSE_FIELDS
         )
+        await catalog.ensure_loaded(self.elastic)
+        return catalog.page(commons, fields_)
 
-        return genres.body["hits"]["hits"]
+    def export(self, params: ExportQueryParams) -> AsyncIterator[bytes]:
+        """Поток NDJSON со всеми жанрами индекса `genres`."""
+        fields = parse_fields(params.fields, serializers.GENRE_EXPORT_FIELDS)
+        return ndjson_stream(self.elastic, "genres", fields, params.gzip)
 
     def __str__(self):
         return "GenreService"
@@ -0,0 +1,109 @@
+"""Курсорная пагинация через `search_after` с необязательным point-in-time.
+
+Глубина страницы при `from_` растёт линейно: каждый шард собирает `from_ + size`
+документов. С курсором ES продолжает выдачу с последнего ключа сортировки,
+и стоимость страницы не зависит от её номера.
+"""
+import base64
+import binascii
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Optional
+
+import orjson
+from elasticsearch import AsyncElasticsearch
+from fastapi import HTTPException
+
+from src.core.config import PIT_KEEP_ALIVE
+from src.services import serializers
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Поле, по которому упорядочиваются документы с одинаковыми значениями сортировки.
+TIEBREAK_FIELD = "id"
+
+
+@dataclass
+class Cursor:
+    """Непрозрачный для клиента токен: ключ сортировки последнего документа и id point-in-time."""
+
+    search_after: Optional[list] = None
+    pit_id: Optional[str] = None
+
+    def encode(self) -> str:
+        data = orjson.dumps({"after": self.search_after, "pit": self.pit_id})
+        return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "Cursor":
+        try:
+            data = orjson.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            return cls(search_after=data["after"], pit_id=data["pit"])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="invalid cursor")
+
+
+@dataclass
+class Page:
+    hits: list
+    next_cursor: Optional[str] = None
+    aggregations: Optional[dict] = None
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {NEXT_CURSOR_HEADER: self.next_cursor} if self.next_cursor else {}
+
+
+def with_tiebreak(sort: list) -> list:
+    """Добавляет к сортировке уникальное поле, чтобы порядок выдачи был стабильным."""
+    if any(TIEBREAK_FIELD in item for item in sort if isinstance(item, dict)):
+        return sort
+    return [*sort, {TIEBREAK_FIELD: "asc"}]
+
+
+async def search_page(
+    elastic: AsyncElasticsearch,
+    index: str,
+    query: dict,
+    sort: list,
+    from_: int,
+    size: int,
+    cursor: Optional[Cursor],
+    pit: bool,
+    source_includes: list[str],
+    aggs: Optional[dict] = None,
+) -> Page:
+    """Одна страница выдачи: по `from_`, а если передан курсор или запрошен point-in-time — через `search_after`."""
+    params = dict(
+        query=query,
+        sort=with_tiebreak(sort),
+        size=size,
+        source_includes=source_includes,
+        filter_path=serializers.HITS_FILTER_PATH,
+    )
+    if aggs:
+        params["aggs"] = aggs
+        params["filter_path"] = [*serializers.HITS_FILTER_PATH, "aggregations"]
+    pit_id = cursor.pit_id if cursor else None
+    if pit and pit_id is None:
+        pit_id = (await elastic.open_point_in_time(index=index, keep_alive=PIT_KEEP_ALIVE))["id"]
+
+    if pit_id:
+        params["pit"] = {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE}
+    else:
+        params["index"] = index
+    if cursor and cursor.search_after:
+        params["search_after"] = cursor.search_after
+    else:
+        params["from_"] = from_
+
+    response = await elastic.search(**params)
+    hits = serializers.hits(response)
+    aggregations = response.get("aggregations")
+    pit_id = response.get("pit_id", pit_id)
+    if not hits or len(hits) < size:
+        if pit_id:
+            await elastic.close_point_in_time(id=pit_id)
+        return Page(hits=hits, aggregations=aggregations)
+    next_cursor = Cursor(search_after=hits[-1]["sort"], pit_id=pit_id).encode()
+    return Page(hits=hits, next_cursor=next_cursor, aggregations=aggregations)
@@ -0,0 +1,124 @@
+import asyncio
+import inspect
+import re
+import sys
+
+from src.benchmarks.env import setup_env
+
+setup_env()
+
+from fastapi import HTTPException  # noqa: E402
+
+from src.services.pagination import NEXT_CURSOR_HEADER, Cursor, search_page, with_tiebreak  # noqa: E402
+
+
+class FakeElasticsearch:
+    def __init__(self, hits):
+        self.hits = hits
+        self.searches = []
+        self.closed_pits = []
+
+    async def search(self, **params):
+        self.searches.append(params)
+        response = {"hits": {"hits": self.hits}} if self.hits else {}
+        if "pit" in params:
+            response["pit_id"] = params["pit"]["id"]
+        return response
+
+    async def open_point_in_time(self, index, keep_alive):
+        return {"id": "pit-1"}
+
+    async def close_point_in_time(self, id):
+        self.closed_pits.append(id)
+
+
+def make_hits(count):
+    return [{"_source": {"id": str(i)}, "sort": [i, str(i)]} for i in range(count)]
+
+
+def get_page(elastic, size, cursor=None, pit=False):
+    return asyncio.run(
+        search_page(
+            elastic,
+            index="movies",
+            query={"match_all": {}},
+            sort=[{"imdb_rating": "desc"}],
+            from_=0,
+            size=size,
+            cursor=cursor,
+            pit=pit,
+            source_includes=["id"],
+        )
+    )
+
+
+def test_cursor_round_trip():
+    cursor = Cursor(search_after=[8.5, "abc"], pit_id="pit-1")
+
+    assert Cursor.decode(cursor.encode()) == cursor
+
+
+def test_cursor_token_has_no_padding():
+    assert "=" not in Cursor(search_after=[1]).encode()
+
+
+def test_error_on_corrupted_cursor():
+    for token in ("not base64!", "e30", "bm90IGpzb24"):
+        try:
+            Cursor.decode(token)
+        except HTTPException as error:
+            assert error.status_code == 400
+            continue
+        assert False, token
+
+
+def test_tiebreak_added_once():
+    assert with_tiebreak([{"imdb_rating": "desc"}]) == [{"imdb_rating": "desc"}, {"id": "asc"}]
+    assert with_tiebreak([{"id": "desc"}]) == [{"id": "desc"}]
+
+
+def test_empty_page_with_zero_size():
+    page = get_page(FakeElasticsearch([]), size=0)
+
+    assert page.hits == []
+    assert page.headers == {}
+
+
+def test_partial_page_has_no_cursor():
+    page = get_page(FakeElasticsearch(make_hits(3)), size=5)
+
+    assert len(page.hits) == 3
+    assert NEXT_CURSOR_HEADER not in page.headers
+
+
+def test_full_page_has_cursor_of_last_hit():
+    page = get_page(FakeElasticsearch(make_hits(5)), size=5)
+
+    assert Cursor.decode(page.headers[NEXT_CURSOR_HEADER]).search_after == [4, "4"]
+
+
+def test_cursor_replaces_offset():
+    elastic = FakeElasticsearch(make_hits(5))
+    get_page(elastic, size=5, cursor=Cursor(search_after=[4, "4"]))
+
+    assert elastic.searches[0]["search_after"] == [4, "4"]
+    assert "from_" not in elastic.searches[0]
+
+
+def test_last_pit_page_closes_pit():
+    elastic = FakeElasticsearch(make_hits(2))
+    page = get_page(elastic, size=5, pit=True)
+
+    assert "index" not in elastic.searches[0]
+    assert elastic.closed_pits == ["pit-1"]
+    assert page.headers == {}
+
+
+def run_tests(pattern="test_*"):
+    search_pattern = re.compile(pattern)
+    for name, func in inspect.getmembers(sys.modules[__name__]):
+        if search_pattern.match(name):
+            func()
+
+
+run_tests()
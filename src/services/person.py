@@ -1,18 +1,50 @@
-from functools import lru_cache
-from typing import List, Optional
+from functools import lru_cache, partial
+from http import HTTPStatus
+from typing import AsyncIterator, Optional
 
-import orjson
-from elasticsearch import AsyncElasticsearch, NotFoundError
-from fastapi_redis_cache import cache
+from elasticsearch import AsyncElasticsearch, BadRequestError, NotFoundError
 from redis.asyncio import Redis
 
-from src.core.config import PERSON_CACHE_EXPIRE_IN_SECONDS
+from src.core.config import PERSON_CACHE_EXPIRE_IN_SECONDS, STALE_CACHE_EXPIRE_IN_SECONDS
 from src.db.elastic import get_elastic
 from src.db.redis import get_redis
-from fastapi import Depends
+from fastapi import Depends, HTTPException
 
-from src.services.common import CommonQueryParamsMixin
-from src.models.person import Person
+from src.services import etl_events, serializers
+from src.services.batch import get_details_by_ids
+from src.services.budget import acquire_or_reject, rate_limited, within_budget
+from src.services.cache import ResponseBody, ResponseCache
+from src.services.common import (
+    CommonQueryParamsMixin,
+    ExportQueryParams,
+    fields_key,
+    fields_variant,
+    parse_fields,
+    parse_response_fields,
+)
+from src.services.export import ndjson_stream
+from src.services.pagination import search_page
+from src.services.ratelimit import RequestLimiter
+from src.services.suggest import suggest
+
+
+SORT_ORDERS = ("asc", "desc")
+
+
+def person_sort(sort: str | None) -> list[dict]:
+    """Сортировка ES из параметра `field:(asc|desc),...`; некорректное значение — 400."""
+    if not sort:
+        return []
+    result = []
+    for item in sort.split(","):
+        field, _, order = item.strip().partition(":")
+        if not field or order not in SORT_ORDERS:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f"invalid sort: {item}; expected field_name:(asc|desc)",
+            )
+        result.append({"full_name.raw" if field == "full_name" else field: order})
+    return result
 
 
 class PersonService:
@@ -21,56 +53,154 @@ class PersonService:
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis = redis
         self.elastic = elastic
+        self.cache = ResponseCache(redis)
+        self.limiter = RequestLimiter(redis)
+
+    async def get_person_by_id(self, person_id: str, fields: str | None = None) -> Optional[ResponseBody]:
+        """Возвращает тело ответа с данными персонажа по его ID."""
+        fields_ = parse_response_fields(fields, serializers.PERSON_FIELDS, serializers.PERSON_FIELDS)
+        key, variant = f"person:{person_id}:fields", fields_variant(fields_)
+        body = await self.cache.get_variant(key, variant)
+        if body is None:
+            body = await rate_limited("person", self.limiter, self._fetch_person(key, variant, person_id, fields_))
+        return body
 
-    async def get_person_by_id(self, person_id: str) -> Optional[Person]:
-        """Возвращает данные персонажа по его ID."""
-        result = await self._get_person_from_elastic(person_id)
-        person = orjson.loads(result.body)
-        return Person(**person)
+    async def _fetch_person(self, key: str, variant: str, person_id: str, fields: list[str]) -> Optional[ResponseBody]:
+        body = await self._get_person_from_elastic(person_id, fields)
+        if body is not None:
+            await self.cache.set_variant(key, variant, body, PERSON_CACHE_EXPIRE_IN_SECONDS)
+        return body
 
-    @cache(expire=PERSON_CACHE_EXPIRE_IN_SECONDS)
-    async def _get_person_from_elastic(self, person_id: str) -> Optional[Person]:
-        """Получает данные о фильме из ES по person_id."""
+    async def _get_person_from_elastic(self, person_id: str, fields: list[str]) -> Optional[ResponseBody]:
+        """Получает данные о персонаже из ES по person_id."""
         try:
-            doc = await self.elastic.get(index="persons", id=person_id)
+            doc = await self.elastic.get(index="persons", id=person_id, source_includes=fields)
         except NotFoundError:
             return None
-        return doc["_source"]
+        return ResponseBody(serializers.person_details(doc["_source"], fields))
+
+    async def get_filmography(self, person_id: str) -> Optional[ResponseBody]:
+        """Возвращает тело ответа с фильмами персонажа.
 
-    async def get_persons(self, commons: CommonQueryParamsMixin) -> Optional[List[Person]]:
-        """Получаем список персонажей."""
+        ETL хранит в документе персонажа ID его фильмов и роли, поэтому хватает одного `get` и одного `mget`
+        без nested-запросов по `movies`.
+        """
+        key = f"person:{person_id}:films"
+        body = await self.cache.get(key)
+        if body is None:
+            body = await rate_limited("person_films", self.limiter, self._fetch_filmography(key, person_id))
+        return body
+
+    async def _fetch_filmography(self, key: str, person_id: str) -> Optional[ResponseBody]:
         try:
-            results = await self._get_persons_from_elastic(commons)
-            persons = orjson.loads(results.body)
-            result = [Person(**person["_source"]) for person in persons]
-        except:
+            doc = await self.elastic.get(index="persons", id=person_id, source_includes=serializers.PERSON_FILMS_FIELDS)
+        except NotFoundError:
             return None
-        return result
+        films = doc["_source"].get("films") or []
+        docs = []
+        if films:
+            response = await self.elastic.mget(
+                index="movies",
+                ids=[film["id"] for film in films],
+                source_includes=serializers.FILM_LIST_FIELDS,
+            )
+            docs = response["docs"]
+        body = ResponseBody(serializers.person_films(films, docs))
+        await self.cache.set(key, body, PERSON_CACHE_EXPIRE_IN_SECONDS)
+        return body
+
+    async def get_by_ids(self, person_ids: list[str], fields: str | None = None) -> ResponseBody:
+        """Возвращает тело ответа со списком персонажей по их ID."""
+        fields_ = parse_response_fields(fields, serializers.PERSON_FIELDS, serializers.PERSON_FIELDS)
+        return await get_details_by_ids(
+            self.cache,
+            self.elastic,
+            index="persons",
+            key_prefix="person",
+            ids=person_ids,
+            source_includes=fields_,
+            serialize=partial(serializers.person_details, fields=fields_),
+            expire=PERSON_CACHE_EXPIRE_IN_SECONDS,
+            variant=fields_variant(fields_),
+            before_fetch=partial(acquire_or_reject, "persons_batch", self.limiter),
+        )
+
+    async def get_persons(self, commons: CommonQueryParamsMixin, fields: str | None = None) -> Optional[ResponseBody]:
+        """Возвращает тело ответа со списком персонажей."""
+        fields_ = parse_response_fields(fields, serializers.PERSON_FIELDS, serializers.PERSON_FIELDS)
+        sort = person_sort(commons.sort)
+        key = f"persons:{commons}{fields_key(fields_, serializers.PERSON_FIELDS)}"
+        if not commons.cacheable:
+            # Страницы point-in-time не кэшируются и не имеют старых версий, но ES нагружают так же
+            return await rate_limited("persons", self.limiter, self._fetch_persons(key, commons, sort, fields_))
+        body = await self.cache.get(key)
+        if body is None:
+            body = await within_budget(
+                "persons", self.limiter, self._fetch_persons(key, commons, sort, fields_), lambda: self.cache.get_stale(key)
+            )
+        return body
 
-    @cache(expire=PERSON_CACHE_EXPIRE_IN_SECONDS)
-    async def _get_persons_from_elastic(self, commons: CommonQueryParamsMixin) -> Optional[Person]:
-        sort = {}
-        if commons.sort:
-            sort = dict([(k, v) if k != "full_name" else ("full_name.raw", v) for k, v in tuple(tuple(v.split(':')) for v in commons.sort.split(','))])
+    async def _fetch_persons(
+        self, key: str, commons: CommonQueryParamsMixin, sort: list[dict], fields: list[str]
+    ) -> Optional[ResponseBody]:
+        try:
+            body = await self._get_persons_from_elastic(commons, sort, fields)
+        except BadRequestError:
+            return None
+        if body is not None and commons.cacheable:
+            await self.cache.set(key, body, PERSON_CACHE_EXPIRE_IN_SECONDS, STALE_CACHE_EXPIRE_IN_SECONDS)
+        return body
 
+    async def _get_persons_from_elastic(
+        self, commons: CommonQueryParamsMixin, sort: list[dict], fields: list[str]
+    ) -> Optional[ResponseBody]:
         if commons.filter_ is not None:
             query = {"match": {"full_name": commons.filter_}}
         else:
             query = {"match_all": {}}
-        persons = await self.elastic.search(
+        page = await search_page(
+            self.elastic,
             index="persons",
-            from_=commons.from_,
+            query=query,
             sort=sort,
+            from_=commons.from_,
             size=commons.size,
-            query=query,
+            cursor=commons.cursor,
+            pit=commons.pit,
+            source_includes=fields,
+        )
+        if not page.hits:
+            return None
+        return ResponseBody(serializers.persons_list(page.hits, fields), page.headers)
+
+    async def suggest(self, prefix: str, size: int) -> ResponseBody:
+        """Возвращает тело ответа с подсказками имён персонажей по началу ввода."""
+        return await suggest(
+            self.elastic,
+            index="persons",
+            field="full_name.suggest",
+            prefix=prefix,
+            size=size,
+            source_includes=serializers.PERSON_FIELDS,
         )
 
-        return persons.body["hits"]["hits"]
+    def export(self, params: ExportQueryParams) -> AsyncIterator[bytes]:
+        """Поток NDJSON со всеми персонажами индекса `persons`."""
+        fields = parse_fields(params.fields, serializers.PERSON_EXPORT_FIELDS)
+        return ndjson_stream(self.elastic, "persons", fields, params.gzip)
 
     def __str__(self):
         return "PersonService"
 
 
+@etl_events.subscribe("persons", once=True)
+async def invalidate_persons(redis: Redis, elastic: AsyncElasticsearch, ids: list[str]) -> None:
+    """Переиндексированные персонажи удаляются из кэша со всеми наборами полей и фильмографией."""
+    keys = [key for person_id in ids for key in (f"person:{person_id}:fields", f"person:{person_id}:films")]
+    if keys:
+        await redis.delete(*keys)
+
+
 @lru_cache()
 def get_person_service(redis: Redis = Depends(get_redis),
                        elastic: AsyncElasticsearch = Depends(get_elastic)) -> PersonService:
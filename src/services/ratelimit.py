@@ -0,0 +1,79 @@
+"""Ограничение частоты запросов к ES: token bucket в Redis, общий для всех воркеров.
+
+Для каждой ручки два ведра: общее (защищает ES) и на клиента (один клиент
+не выбирает весь лимит). Токен списывается, только если он есть в обоих.
+Лимит применяется лишь к запросам, которым нужен ES, — ответы из кэша им не
+ограничиваются. Если токена нет, запрос ждёт его не дольше
+`RATE_LIMIT_MAX_WAIT_SECONDS`.
+"""
+import asyncio
+import logging
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.core.client import current_client
+from src.core.config import RATE_LIMIT_MAX_WAIT_SECONDS, RATE_LIMITS
+from src.core.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# KEYS — ключи вёдер, ARGV — пары (токенов в секунду, ёмкость) для каждого ведра.
+# Возвращает {1, "0"}, если токен списан, иначе {0, "<секунд до появления токена>"}.
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local tokens = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local burst = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    available = math.min(burst, available + math.max(0, now - updated) * rate)
+    tokens[i] = available
+    if available < 1 then
+        wait = math.max(wait, (1 - available) / rate)
+    end
+end
+if wait > 0 then
+    return {0, tostring(wait)}
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local burst = tonumber(ARGV[2 * i])
+    redis.call('HSET', key, 'tokens', tokens[i] - 1, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+end
+return {1, '0'}
+"""
+
+
+class RequestLimiter:
+    def __init__(self, redis: Redis):
+        self.script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    @timed("ratelimit")
+    async def acquire(self, route: str) -> bool:
+        """Берёт токен ручки `route` для текущего клиента; False — токена не дождались."""
+        limits = RATE_LIMITS.get(route)
+        if limits is None:
+            return True
+        keys = [f"ratelimit:{route}", f"ratelimit:{route}:{current_client.get()}"]
+        args = [*limits["route"], *limits["client"]]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + RATE_LIMIT_MAX_WAIT_SECONDS
+        while True:
+            try:
+                allowed, wait = await self.script(keys=keys, args=args)
+            except RedisError:
+                # Без Redis лимит не работает: запрос пропускается, а не отклоняется
+                logger.warning("Rate limiter is unavailable", exc_info=True)
+                return True
+            if allowed:
+                return True
+            wait = float(wait)
+            if loop.time() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
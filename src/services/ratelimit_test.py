@@ -0,0 +1,129 @@
+import asyncio
+import inspect
+import re
+import sys
+
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.benchmarks.env import setup_env
+
+setup_env()
+
+from src.core.client import current_client  # noqa: E402
+from src.core.config import RATE_LIMIT_MAX_WAIT_SECONDS, RATE_LIMITS  # noqa: E402
+from src.services.budget import rate_limited  # noqa: E402
+from src.services.ratelimit import TOKEN_BUCKET_SCRIPT, RequestLimiter  # noqa: E402
+
+
+class FakeScript:
+    """Возвращает заранее заданные ответы скрипта token bucket по очереди."""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    async def __call__(self, keys=None, args=None):
+        self.calls.append({"keys": keys, "args": args})
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+class FakeRedis:
+    def __init__(self, replies):
+        self.script = FakeScript(replies)
+
+    def register_script(self, script):
+        assert script == TOKEN_BUCKET_SCRIPT
+        return self.script
+
+
+def acquire(redis, route="films", client="10.0.0.1"):
+    async def run():
+        current_client.set(client)
+        return await RequestLimiter(redis).acquire(route)
+
+    return asyncio.run(run())
+
+
+def test_route_without_limits_is_not_checked():
+    redis = FakeRedis([])
+
+    assert acquire(redis, route="genres") is True
+    assert redis.script.calls == []
+
+
+def test_route_and_client_buckets():
+    redis = FakeRedis([[1, b"0"]])
+
+    assert acquire(redis) is True
+    assert redis.script.calls == [
+        {
+            "keys": ["ratelimit:films", "ratelimit:films:10.0.0.1"],
+            "args": [*RATE_LIMITS["films"]["route"], *RATE_LIMITS["films"]["client"]],
+        }
+    ]
+
+
+def test_waits_for_next_token():
+    redis = FakeRedis([[0, b"0.01"], [1, b"0"]])
+
+    assert acquire(redis) is True
+    assert len(redis.script.calls) == 2
+
+
+def test_rejects_if_token_comes_after_max_wait():
+    redis = FakeRedis([[0, str(RATE_LIMIT_MAX_WAIT_SECONDS * 2).encode()]])
+
+    assert acquire(redis) is False
+    assert len(redis.script.calls) == 1
+
+
+def test_lets_request_through_without_redis():
+    redis = FakeRedis([RedisConnectionError("connection refused")])
+
+    assert acquire(redis) is True
+
+
+def limited_fetch(redis):
+    fetched = []
+
+    async def fetch():
+        fetched.append(True)
+        return "body"
+
+    async def run():
+        current_client.set("10.0.0.1")
+        try:
+            return await rate_limited("films", RequestLimiter(redis), fetch())
+        except HTTPException as error:
+            return error
+
+    return asyncio.run(run()), fetched
+
+
+def test_rate_limited_fetches_with_token():
+    result, fetched = limited_fetch(FakeRedis([[1, b"0"]]))
+
+    assert result == "body"
+    assert fetched == [True]
+
+
+def test_rate_limited_rejects_without_token():
+    result, fetched = limited_fetch(FakeRedis([[0, str(RATE_LIMIT_MAX_WAIT_SECONDS * 2).encode()]]))
+
+    assert result.status_code == 429
+    assert result.headers == {"Retry-After": "1"}
+    assert fetched == []
+
+
+def run_tests(pattern="test_*"):
+    search_pattern = re.compile(pattern)
+    for name, func in inspect.getmembers(sys.modules[__name__]):
+        if search_pattern.match(name):
+            func()
+
+
+run_tests()
@@ -0,0 +1,78 @@
+"""Готовность воркера принимать трафик.
+
+При старте воркер заранее открывает пулы соединений с Redis и ES, выполняет
+по лёгкому поиску в каждом индексе и загружает справочник жанров. Пока это не
+сделано, `/health/ready` отвечает 503, и балансировщик не направляет на воркер
+запросы, которые иначе оплатили бы DNS, TCP и прогрев ES.
+"""
+import asyncio
+import logging
+
+from elasticsearch import AsyncElasticsearch
+from redis.asyncio import Redis
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from src.core.config import READINESS_RETRY_SECONDS, AppBaseSettings
+from src.services.genre import catalog as genre_catalog
+
+logger = logging.getLogger(__name__)
+
+WARMUP_INDICES = ("movies", "genres", "persons")
+
+
+class Readiness:
+    def __init__(self):
+        self.checks = {"redis": False, "elastic": False, "genres": False}
+
+    @property
+    def ready(self) -> bool:
+        return all(self.checks.values())
+
+    async def prepare(self, redis: Redis, elastic: AsyncElasticsearch, settings: AppBaseSettings) -> None:
+        """Выполняет ещё не пройденные шаги подготовки; упавший шаг не мешает остальным."""
+        steps = {
+            "redis": lambda: self._open_redis(redis, settings),
+            "elastic": lambda: self._open_elastic(elastic, settings),
+            "genres": lambda: genre_catalog.ensure_loaded(elastic),
+        }
+        pending = [name for name, done in self.checks.items() if not done]
+        results = await asyncio.gather(*(steps[name]() for name in pending), return_exceptions=True)
+        for name, result in zip(pending, results):
+            if isinstance(result, Exception):
+                logger.warning("Readiness check %s failed: %r", name, result)
+            else:
+                self.checks[name] = True
+
+    async def prepare_until_ready(self, redis: Redis, elastic: AsyncElasticsearch, settings: AppBaseSettings) -> None:
+        while not self.ready:
+            await asyncio.sleep(READINESS_RETRY_SECONDS)
+            await self.prepare(redis, elastic, settings)
+        logger.info("Worker is ready")
+
+    @staticmethod
+    async def _open_redis(redis: Redis, settings: AppBaseSettings) -> None:
+        # Одновременные команды берут из пула разные соединения, и пул их открывает
+        await asyncio.gather(*(redis.ping() for _ in range(settings.redis_min_connections)))
+
+    @staticmethod
+    async def _open_elastic(elastic: AsyncElasticsearch, settings: AppBaseSettings) -> None:
+        nodes = len(settings.es_hosts) or 1
+        pings = await asyncio.gather(*(elastic.ping() for _ in range(settings.es_min_connections * nodes)))
+        if not all(pings):
+            raise ConnectionError("Elasticsearch is not available")
+        await asyncio.gather(
+            *(elastic.search(index=index, size=1, filter_path=["hits.total"]) for index in WARMUP_INDICES)
+        )
+
+
+readiness = Readiness()
+
+
+async def readiness_endpoint(request: Request) -> Response:
+    status_code = 200 if readiness.ready else 503
+    return JSONResponse({"ready": readiness.ready, "checks": readiness.checks}, status_code=status_code)
+
+
+async def liveness_endpoint(request: Request) -> Response:
+    return JSONResponse({"alive": True})
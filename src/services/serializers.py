@@ -0,0 +1,135 @@
+"""Сериализация документов ES сразу в тела ответов API.
+
+Каждый документ превращается в JSON ровно один раз, минуя промежуточные
+pydantic-модели. Форма ответов совпадает со схемами из `src/api/v1`.
+"""
+import orjson
+
+from src.core.metrics import timed
+
+# Поля `_source`, которые запрашиваются из ES под каждый ответ.
+FILM_DETAILS_FIELDS = ["id", "title", "imdb_rating", "description", "genre", "actors", "writers", "directors"]
+FILM_LIST_FIELDS = ["id", "title", "imdb_rating"]
+# Для поиска похожих фильмов из документа нужны только ID жанров и персон
+FILM_SIMILAR_FIELDS = ["genre.id", "actors.id", "writers.id", "directors.id"]
+GENRE_DETAILS_FIELDS = ["id", "genre_name", "description"]
+PERSON_FIELDS = ["id", "full_name"]
+PERSON_FILMS_FIELDS = ["films"]
+
+FILM_SUGGEST_FIELDS = ["id", "title"]
+
+# Поля, доступные при потоковой выгрузке индексов.
+FILM_EXPORT_FIELDS = [*FILM_DETAILS_FIELDS, "modified"]
+GENRE_EXPORT_FIELDS = [*GENRE_DETAILS_FIELDS, "modified"]
+PERSON_EXPORT_FIELDS = [*PERSON_FIELDS, "modified"]
+
+# Поля ответов, которые клиент может выбрать параметром `fields=`. У жанров поле ответа
+# `name` хранится в ES как `genre_name`.
+GENRE_RESPONSE_FIELDS = ["id", "name", "description"]
+GENRE_LIST_RESPONSE_FIELDS = ["id", "name"]
+GENRE_SOURCE_FIELDS = {"id": "id", "name": "genre_name", "description": "description"}
+
+# Значения полей фильма, если их нет в документе
+FILM_FIELD_DEFAULTS = {
+    "id": None,
+    "title": "",
+    "imdb_rating": 0,
+    "description": "",
+    "genre": [],
+    "actors": [],
+    "writers": [],
+    "directors": [],
+}
+
+# Из ответа поиска ES оставляем только `_source` и ключи сортировки найденных документов.
+HITS_FILTER_PATH = ["hits.hits._source", "hits.hits.sort", "pit_id"]
+
+
+@timed("serialize")
+def film_details(source: dict, fields: list[str] = FILM_DETAILS_FIELDS) -> bytes:
+    """Тело ответа `/api/v1/films/{film_id}` из полей `fields`."""
+    return orjson.dumps(film_for_list(source, fields))
+
+
+def film_for_list(source: dict, fields: list[str] = FILM_LIST_FIELDS) -> dict:
+    return {field: source.get(field) or FILM_FIELD_DEFAULTS[field] for field in fields}
+
+
+@timed("serialize")
+def films_list(hits: list, fields: list[str] = FILM_LIST_FIELDS) -> bytes:
+    """Тело ответа списка фильмов `/api/v1/films/` и `/api/v1/films/search/`."""
+    return orjson.dumps([film_for_list(hit["_source"], fields) for hit in hits])
+
+
+def hits(response) -> list:
+    """Найденные документы из ответа ES. С `filter_path` при пустой выдаче ключа `hits` нет."""
+    return response.get("hits", {}).get("hits", [])
+
+
+@timed("serialize")
+def facets(aggregations: dict) -> bytes:
+    """Фасеты выдачи фильмов из агрегаций `FACETS_AGGS`."""
+    return orjson.dumps(
+        {
+            "genre": [
+                {
+                    "id": bucket["key"],
+                    "name": bucket["name"]["hits"]["hits"][0]["_source"]["name"],
+                    "count": bucket["doc_count"],
+                }
+                for bucket in aggregations["genre"]["ids"]["buckets"]
+            ],
+            "imdb_rating": [
+                {"from": bucket["key"], "count": bucket["doc_count"]}
+                for bucket in aggregations["imdb_rating"]["buckets"]
+            ],
+        }
+    )
+
+
+def with_facets(items: bytes, facets_: bytes) -> bytes:
+    """Склеивает готовые тела списка и фасетов без повторной сериализации."""
+    return b'{"items":' + items + b',"facets":' + facets_ + b"}"
+
+
+def film_page(film: bytes, genres: list[bytes], persons: bytes) -> bytes:
+    """Тело ответа `/api/v1/films/{film_id}/page` из готовых тел фильма, жанров и персонажей."""
+    return b'{"film":' + film + b',"genres":[' + b",".join(genres) + b'],"persons":' + persons + b"}"
+
+
+def genre_details(source: dict, fields: list[str] = GENRE_RESPONSE_FIELDS) -> bytes:
+    """Тело ответа `/api/v1/genres/{genre_id}`."""
+    return orjson.dumps({field: source.get(GENRE_SOURCE_FIELDS[field]) for field in fields})
+
+
+def genre_list_item(source: dict, fields: list[str] = GENRE_LIST_RESPONSE_FIELDS) -> bytes:
+    """Элемент списка `/api/v1/genres/`."""
+    return genre_details(source, fields)
+
+
+@timed("serialize")
+def person_details(source: dict, fields: list[str] = PERSON_FIELDS) -> bytes:
+    """Тело ответа `/api/v1/persons/{person_id}`."""
+    return orjson.dumps({field: source.get(field) for field in fields})
+
+
+@timed("serialize")
+def person_films(films: list, docs: list) -> bytes:
+    """Тело ответа `/api/v1/persons/{person_id}/films`: фильмы из `mget` с ролями персонажа в них."""
+    found = {doc["_id"]: doc["_source"] for doc in docs if doc.get("found")}
+    return orjson.dumps(
+        [{**film_for_list(found[film["id"]]), "roles": film["roles"]} for film in films if film["id"] in found]
+    )
+
+
+@timed("serialize")
+def persons_list(hits: list, fields: list[str] = PERSON_FIELDS) -> bytes:
+    """Тело ответа `/api/v1/persons/`."""
+    return orjson.dumps([{field: hit["_source"].get(field) for field in fields} for hit in hits])
+
+
+@timed("serialize")
+def suggestions(response, name: str) -> bytes:
+    """Тело ответа подсказок: `_source` вариантов из completion suggester `name`."""
+    options = response.get("suggest", {}).get(name, [{}])[0].get("options", [])
+    return orjson.dumps([option["_source"] for option in options])
@@ -0,0 +1,32 @@
+"""Подсказки при наборе по полям completion suggester (`title.suggest`, `full_name.suggest`).
+
+Completion suggester отвечает из структуры в памяти ES без обхода индекса,
+а результаты по префиксам дополнительно кэшируются в памяти процесса:
+повторные префиксы отдаются без сетевых вызовов.
+"""
+from elasticsearch import AsyncElasticsearch
+
+from src.core.config import SUGGEST_CACHE_EXPIRE_IN_SECONDS, SUGGEST_CACHE_SIZE
+from src.services import serializers
+from src.services.cache import LocalCache, ResponseBody
+from src.services.common import normalize_text
+
+suggest_cache = LocalCache(maxsize=SUGGEST_CACHE_SIZE, expire=SUGGEST_CACHE_EXPIRE_IN_SECONDS)
+
+
+async def suggest(
+    elastic: AsyncElasticsearch, index: str, field: str, prefix: str, size: int, source_includes: list[str]
+) -> ResponseBody:
+    prefix = normalize_text(prefix)
+    key = f"{index}:{size}:{prefix}"
+    body = suggest_cache.get(key)
+    if body is None:
+        response = await elastic.search(
+            index=index,
+            suggest={"suggest": {"prefix": prefix, "completion": {"field": field, "size": size}}},
+            source_includes=source_includes,
+            filter_path=["suggest.suggest.options._source"],
+        )
+        body = ResponseBody(serializers.suggestions(response, "suggest"))
+        suggest_cache.set(key, body)
+    return body
@@ -0,0 +1,135 @@
+"""Прогрев кэша ответов популярными запросами.
+
+После деплоя, сброса Redis или загрузки пачки ETL первые пользователи
+популярных страниц платили бы за поход в ES. Прогрев заранее кладёт в кэш:
+
+* первые `WARMUP_LIST_PAGES` страниц списка фильмов в каждой сортировке из `WARMUP_SORTS`;
+* первую страницу лучших по рейтингу фильмов каждого жанра;
+* детальные страницы `WARMUP_TOP_FILMS` фильмов с наибольшим рейтингом.
+
+Запросы идут через те же сервисы, что и у ручек, поэтому ключи и тела в кэше
+совпадают с живыми. Одновременно выполняется не больше `WARMUP_CONCURRENCY`
+запросов, а из всех воркеров прогревает только тот, кто взял блокировку в Redis.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Optional
+
+from elasticsearch import AsyncElasticsearch
+from redis.asyncio import Redis
+
+from src.core.config import (
+    BATCH_MAX_IDS,
+    DEFAULT_PAGE_SIZE,
+    WARMUP_CONCURRENCY,
+    WARMUP_DEBOUNCE_SECONDS,
+    WARMUP_LIST_PAGES,
+    WARMUP_LOCK_SECONDS,
+    WARMUP_SORTS,
+    WARMUP_TOP_FILMS,
+)
+from src.services import etl_events, serializers
+from src.services.common import CommonQueryParams
+from src.services.film import FilmService
+from src.services.filmdependencies import FilmFilter
+from src.services.genre import catalog as genre_catalog
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = "warmup:lock"
+
+
+def list_params(page: int = 1, sort: Optional[str] = None) -> CommonQueryParams:
+    """Параметры страницы как у запроса ручки по умолчанию: при прямом вызове значения `Query` не подставляются."""
+    return CommonQueryParams(page=page, size=DEFAULT_PAGE_SIZE, sort=sort, cursor=None, pit=False)
+
+
+def film_filter(genre_id: Optional[str] = None) -> FilmFilter:
+    """Фильтр как у запроса ручки: ключ кэша строится и из пустого фильтра."""
+    return FilmFilter(genre=[genre_id] if genre_id else None, person=None, rating_from=None, rating_to=None)
+
+
+class CacheWarmer:
+    def __init__(self):
+        self._scheduled: Optional[asyncio.Task] = None
+
+    async def warm(self, redis: Redis, elastic: AsyncElasticsearch) -> None:
+        """Перезаписывает в кэше все популярные ответы; если прогрев уже идёт в другом воркере, ничего не делает."""
+        if not await redis.set(LOCK_KEY, 1, nx=True, ex=WARMUP_LOCK_SECONDS):
+            return
+        try:
+            await self._warm(redis, elastic)
+        finally:
+            await redis.delete(LOCK_KEY)
+
+    async def _warm(self, redis: Redis, elastic: AsyncElasticsearch) -> None:
+        service = FilmService(redis, elastic)
+        semaphore = asyncio.Semaphore(WARMUP_CONCURRENCY)
+
+        async def limited(job: Awaitable) -> None:
+            async with semaphore:
+                await job
+
+        await genre_catalog.ensure_loaded(elastic)
+        jobs = self.jobs(service, genre_catalog.ids, await self._top_film_ids(elastic))
+        results = await asyncio.gather(*(limited(job) for job in jobs), return_exceptions=True)
+        failed = [result for result in results if isinstance(result, Exception)]
+        for error in failed[:1]:
+            logger.error("Cache warm-up query failed", exc_info=error)
+        logger.info("Cache warmed: %s queries, %s failed", len(jobs), len(failed))
+
+    @staticmethod
+    def jobs(service: FilmService, genre_ids: list[str], top_ids: list[str]) -> list[Awaitable]:
+        """Запросы прогрева: страницы списка в каждой сортировке, топ каждого жанра и детальные страницы топа."""
+        jobs = [
+            service.get_films(commons=list_params(page, sort), filter_=film_filter(), cache_=True, refresh=True)
+            for sort in WARMUP_SORTS
+            for page in range(1, WARMUP_LIST_PAGES + 1)
+        ]
+        jobs.extend(
+            service.get_films(
+                commons=list_params(sort="-imdb_rating"), filter_=film_filter(genre_id), cache_=True, refresh=True
+            )
+            for genre_id in genre_ids
+        )
+        jobs.extend(
+            service.get_by_ids(top_ids[start:start + BATCH_MAX_IDS], refresh=True)
+            for start in range(0, len(top_ids), BATCH_MAX_IDS)
+        )
+        return jobs
+
+    @staticmethod
+    async def _top_film_ids(elastic: AsyncElasticsearch) -> list[str]:
+        response = await elastic.search(
+            index="movies",
+            size=WARMUP_TOP_FILMS,
+            sort=[{"imdb_rating": "desc"}],
+            source=False,
+            filter_path=["hits.hits._id"],
+        )
+        return [hit["_id"] for hit in serializers.hits(response)]
+
+    def schedule(self, redis: Redis, elastic: AsyncElasticsearch) -> None:
+        """Запускает прогрев через `WARMUP_DEBOUNCE_SECONDS`; уведомления, пришедшие за это время, его не повторяют."""
+        if self._scheduled is not None and not self._scheduled.done():
+            return
+        self._scheduled = asyncio.create_task(self._warm_later(redis, elastic))
+
+    def cancel(self) -> None:
+        if self._scheduled is not None:
+            self._scheduled.cancel()
+
+    async def _warm_later(self, redis: Redis, elastic: AsyncElasticsearch) -> None:
+        await asyncio.sleep(WARMUP_DEBOUNCE_SECONDS)
+        try:
+            await self.warm(redis, elastic)
+        except Exception:
+            logger.exception("Cache warm-up failed")
+
+
+warmer = CacheWarmer()
+
+
+@etl_events.subscribe("movies")
+async def warm_after_etl(redis: Redis, elastic: AsyncElasticsearch, ids: list[str]) -> None:
+    warmer.schedule(redis, elastic)
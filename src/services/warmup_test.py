@@ -0,0 +1,85 @@
+import asyncio
+import inspect
+import re
+import sys
+
+from src.benchmarks.env import setup_env
+
+setup_env()
+
+from src.benchmarks.fakes import FakeElasticsearch, FakeRedis, make_catalog  # noqa: E402
+from src.core.config import BATCH_MAX_IDS, DEFAULT_PAGE_SIZE, WARMUP_LIST_PAGES, WARMUP_SORTS  # noqa: E402
+from src.services.common import fields_variant  # noqa: E402
+from src.services.filmdependencies import FilmQuery  # noqa: E402
+from src.services.serializers import FILM_DETAILS_FIELDS  # noqa: E402
+from src.services.warmup import LOCK_KEY, CacheWarmer, film_filter, list_params  # noqa: E402
+
+
+class RecordingFilmService:
+    def __init__(self):
+        self.calls = []
+
+    async def get_films(self, **kwargs):
+        self.calls.append(("get_films", kwargs))
+
+    async def get_by_ids(self, ids, refresh=False):
+        self.calls.append(("get_by_ids", ids))
+
+
+def list_key(page, sort, genre_id=None):
+    """Ключ кэша, под которым страницу списка ищет ручка `/api/v1/films/`."""
+    return f"films:{list_params(page, sort)}&{FilmQuery(filter_=film_filter(genre_id), match_query=None)}&facets=False"
+
+
+def test_list_params_match_endpoint_defaults():
+    params = list_params(2, "-imdb_rating")
+
+    assert params.size == DEFAULT_PAGE_SIZE
+    assert params.from_ == DEFAULT_PAGE_SIZE
+    assert params.sort == {"imdb_rating": "desc"}
+    assert params.cacheable
+
+
+def test_jobs_cover_lists_genres_and_top_films():
+    service = RecordingFilmService()
+    top_ids = [str(i) for i in range(BATCH_MAX_IDS + 1)]
+
+    async def run():
+        await asyncio.gather(*CacheWarmer.jobs(service, ["g1", "g2"], top_ids))
+
+    asyncio.run(run())
+
+    films_calls = [kwargs for name, kwargs in service.calls if name == "get_films"]
+    batches = [ids for name, ids in service.calls if name == "get_by_ids"]
+    assert len(films_calls) == len(WARMUP_SORTS) * WARMUP_LIST_PAGES + 2
+    assert all(kwargs["refresh"] and kwargs["cache_"] for kwargs in films_calls)
+    assert [film_filter_.genre for film_filter_ in (kwargs["filter_"] for kwargs in films_calls[-2:])] == [
+        ["g1"],
+        ["g2"],
+    ]
+    assert batches == [top_ids[:BATCH_MAX_IDS], top_ids[BATCH_MAX_IDS:]]
+
+
+def test_warm_fills_keys_of_live_requests():
+    catalog = make_catalog(films=100, persons=50)
+    redis = FakeRedis()
+    elastic = FakeElasticsearch(catalog)
+
+    asyncio.run(CacheWarmer().warm(redis, elastic))
+
+    genre_id = catalog["genres"][0]["id"]
+    film_id = max(catalog["movies"], key=lambda film: film["imdb_rating"])["id"]
+    for key in (list_key(1, None), list_key(3, "imdb_rating"), list_key(1, "-imdb_rating", genre_id)):
+        assert redis._get(key) is not None, key
+    assert redis._hget(f"film:{film_id}:fields", fields_variant(FILM_DETAILS_FIELDS)) is not None
+    assert redis._get(LOCK_KEY) is None
+
+
+def run_tests(pattern="test_*"):
+    search_pattern = re.compile(pattern)
+    for name, func in inspect.getmembers(sys.modules[__name__]):
+        if search_pattern.match(name):
+            func()
+
+
+run_tests()